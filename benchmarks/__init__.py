@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+
+__author__ = 'Samir Adrik'
+__email__ = 'samir.adrik@gmail.com'
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+__author__ = 'Samir Adrik'
+__email__ = 'samir.adrik@gmail.com'
+
+from source.multivariate_norm.r_session import RSession
+from source.util.table_writer import TableWriter
+import tracemalloc
+import pandas as pd
+import numpy as np
+import time
+import sys
+
+
+def r_peak_bytes(r, run):
+    """
+    Runs run once and measures the peak of the memory it allocates in python and in r
+
+    Parameters
+    ----------
+    r       : rpy2.robjects.R
+              embedded r interpreter
+    run     : callable
+              transfer to be measured
+
+    Returns
+    -------
+    Out     : tuple
+              (python bytes, r bytes)
+
+    """
+    # r reports its memory in steps of 0.1 MiB
+    r('invisible(gc(reset = TRUE))')
+    r_base = r('gc()[2, 2]')[0]
+    tracemalloc.start()
+    result = run()
+    python_bytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    r_bytes = (r('gc()[2, 6]')[0] - r_base) * 2 ** 20
+    del result
+    return python_bytes, max(r_bytes, 0)
+
+
+def best_time(run, repeat: int = 3):
+    """
+    Best wall-clock time of repeat runs
+
+    Parameters
+    ----------
+    run     : callable
+              transfer to be timed
+    repeat  : int
+              number of runs
+
+    Returns
+    -------
+    Out     : float
+              seconds of the fastest run
+
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(columns: int = 10):
+    """
+    Compares transferring a df to r with numpy2ri.numpy2ri(np.array(df)), as the r backed
+    tests used to do, against RSession.matrix() on the shared float64 buffer of a
+    NormalityBattery, for 10^4 to 10^7 cells. The bytes allocated in python and r are given
+    as multiples of the size of the data. Run from the root of the repository with
+
+        python -m benchmarks.r_transfer
+
+    Parameters
+    ----------
+    columns : int
+              number of columns of the df
+
+    """
+    r = RSession.r()
+    from rpy2.robjects import numpy2ri
+
+    rows = []
+    for cells in [10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7]:
+        df = pd.DataFrame(np.random.RandomState(90210).normal(size=(cells // columns,
+                                                                      columns)))
+        buffer = np.asarray(df, dtype=np.float64, order='C')
+
+        def current():
+            return numpy2ri.numpy2ri(np.array(df))
+
+        def transfer():
+            RSession._matrices.clear()
+            return RSession.matrix(buffer)
+
+        for name, run in [('numpy2ri', current), ('matrix', transfer),
+                          ('matrix (reused)', lambda: RSession.matrix(buffer))]:
+            # r may only be used on the dispatcher thread of the r session
+            python_bytes, r_bytes = RSession.call(r_peak_bytes, r, run)
+            rows.append([str(cells), name, "{:.1f}".format(python_bytes / buffer.nbytes),
+                         "{:.1f}".format(r_bytes / buffer.nbytes),
+                         "{:.2f}".format(RSession.call(best_time, run) * 1e3)])
+
+    table = TableWriter(['cells', 'transfer', 'python bytes / data', 'r bytes / data',
+                         'ms'])
+    table.write(sys.stdout, [list(column) for column in zip(*rows)])
+    sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
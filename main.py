@@ -11,5 +11,5 @@ methods = df.__getmethods__()
 
 for method in methods:
     print("starting method: " + method + "()")
-    nb = NormalityBattery(getattr(df, method)())
+    nb = NormalityBattery(getattr(df, method)(), cache_dir='reports/cache')
     nb.normality_report(digits=3)
@@ -18,8 +18,8 @@ setup(
     name='normb',
     version=get_version(),
     packages=['tests', 'source', 'source.util', 'source.multivariate_norm', 'source.exceptions'],
-    requires=['numpy (>=1.15.4)', 'pandas (>=0.24.0)', 'PrettyTable (>=0.7.2)',
-              'pytest (>=4.0.2)', 'rpy2 (>=2.9.4)', 'scipy (>=1.2.1)'],
+    requires=['numpy (>=1.17.0)', 'pandas (>=0.24.0)', 'PrettyTable (>=0.7.2)',
+              'pytest (>=4.0.2)', 'rpy2 (>=3.0.0)', 'scipy (>=1.5.0)'],
     url='',
     license='MIT',
     author='samir',
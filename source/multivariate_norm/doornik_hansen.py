@@ -4,8 +4,10 @@ __author__ = 'Samir Adrik'
 __email__ = 'samir.adrik@gmail.com'
 
 from source.multivariate_norm.normality_test import NormalityTest
-from rpy2.robjects import r
+from source.multivariate_norm.r_session import RSession
+import scipy.stats as stats
 import pandas as pd
+import numpy as np
 import gc
 
 
@@ -15,7 +17,9 @@ class DoornikHansen(NormalityTest):
 
     """
 
-    def __init__(self, df: pd.DataFrame):
+    backends = ('r', 'numpy')
+
+    def __init__(self, df: pd.DataFrame, backend: str = 'r'):
         """
         Constructor / Initiate the class
 
@@ -23,20 +27,72 @@ class DoornikHansen(NormalityTest):
         ----------
         df      : pandas.DataFrame
                   df to be analysed
+        backend : str
+                  'r' or 'numpy', default is 'r'
 
         """
-        super().__init__(df)
+        super().__init__(df, backend=backend)
 
     def run_dh_test(self):
         """
         Runs the Doornik-Hansen test for multivariate normality by delegating the task to the
-        MVN module in r
+        MVN module in r, in a private r environment
+
+        Returns
+        -------
+        Out     : tuple
+                  (dh test statistic, p-value)
 
         """
-        r('require("MVN", character.only = TRUE)')
-        r.assign("df", self.df)
-        r('res <- mvn(df, mvnTest = "dh")')
+        results = RSession.evaluate(
+            'res <- mvn(df, mvnTest = "dh"); '
+            'c(as.numeric(res$multivariateNormality["E"]), '
+            'as.numeric(res$multivariateNormality["p value"]))',
+            df=self.df)
         gc.collect()
+        return tuple(results)
+
+    def run_native_dh_test(self):
+        """
+        Runs the Doornik-Hansen test for multivariate normality in numpy. The data is
+        transformed with the inverse square root of the correlation matrix, obtained from a
+        single symmetric eigendecomposition, and the transformed skewness and kurtosis are
+        computed for all dimensions at once.
+
+        Returns
+        -------
+        Out     : tuple
+                  (dh test statistic, p-value)
+
+        """
+        n, p = self.data.shape
+        xc = self.data - self.data.mean(axis=0)
+        v = 1 / np.sqrt(np.einsum('ij,ij->j', xc, xc) / (n - 1))
+        c = np.dot(xc.T, xc) / (n - 1) * np.outer(v, v)
+        eigenvalues, h = np.linalg.eigh(c)
+        y = np.dot(xc * v, np.dot(h / np.sqrt(eigenvalues), h.T))
+
+        m2 = np.mean(y ** 2, axis=0)
+        b1 = np.mean(y ** 3, axis=0) / m2 ** 1.5
+        b2 = np.mean(y ** 4, axis=0) / m2 ** 2
+
+        delta = (n - 3) * (n + 1) * (n ** 2 + 15 * n - 4)
+        a = ((n - 2) * (n + 5) * (n + 7) * (n ** 2 + 27 * n - 70)) / (6 * delta)
+        c = ((n - 7) * (n + 5) * (n + 7) * (n ** 2 + 2 * n - 5)) / (6 * delta)
+        k = ((n + 5) * (n + 7) * (n ** 3 + 37 * n ** 2 + 11 * n - 313)) / (12 * delta)
+        alpha = a + c * b1 ** 2
+        chi = 2 * k * (b2 - 1 - b1 ** 2)
+        z2 = ((chi / (2 * alpha)) ** (1 / 3) - 1 + 1 / (9 * alpha)) * np.sqrt(9 * alpha)
+
+        beta = (3 * (n ** 2 + 27 * n - 70) * (n + 1) * (n + 3)) / (
+            (n - 2) * (n + 5) * (n + 7) * (n + 9))
+        w2 = -1 + np.sqrt(2 * (beta - 1))
+        y1 = b1 * np.sqrt(((w2 - 1) / 2) * (((n + 1) * (n + 3)) / (6 * (n - 2))))
+        z1 = np.log(y1 + np.sqrt(y1 ** 2 + 1)) / np.sqrt(np.log(np.sqrt(w2)))
+
+        e = np.dot(z1, z1) + np.dot(z2, z2)
+        p_e = stats.chi2.sf(e, 2 * p)
+        return float(e), float(p_e)
 
     def print_results(self):
         """
@@ -48,7 +104,7 @@ class DoornikHansen(NormalityTest):
                   (dh test statistic, p-value)
 
         """
-        self.run_dh_test()
-        dh = r('as.numeric(res$multivariateNormality["E"])')
-        p_dh = r('as.numeric(res$multivariateNormality["p value"])')
-        return tuple(list(dh) + list(p_dh))
+        if self.backend == 'numpy':
+            return self.run_native_dh_test()
+
+        return self.run_dh_test()
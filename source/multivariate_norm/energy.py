@@ -4,9 +4,14 @@ __author__ = 'Samir Adrik'
 __email__ = 'samir.adrik@gmail.com'
 
 from source.multivariate_norm.normality_test import NormalityTest
-from rpy2.robjects import r
+from source.multivariate_norm.r_session import RSession
+from source.util.assertor import Assertor
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from scipy.special import gammaln, hyp1f1
 import pandas as pd
+import numpy as np
 import gc
+import os
 
 
 class Energy(NormalityTest):
@@ -14,27 +19,154 @@ class Energy(NormalityTest):
     Implements the the Energy E test for multivariate normality
     """
 
-    def __init__(self, df: pd.DataFrame):
+    backends = ('r', 'numpy')
+
+    @staticmethod
+    def energy_statistic(x: np.ndarray, tile_size: int = 1024):
+        """
+        Computes the E statistic for multivariate normality of the standardized sample, the
+        mean pairwise distance is summed over tile_size x n tiles of the distance matrix
+
+        Parameters
+        ----------
+        x           : numpy.ndarray
+                      n x d array of observations
+        tile_size   : int
+                      number of rows per tile of the n x n distance matrix
+
+        Returns
+        -------
+        Out         : float
+                      E test statistic
+
+        """
+        n, d = x.shape
+        xc = x - x.mean(axis=0)
+        eigenvalues, vectors = np.linalg.eigh(np.dot(xc.T, xc) / (n - 1))
+        y = np.dot(xc, np.dot(vectors / np.sqrt(eigenvalues), vectors.T))
+        sq = np.einsum('ij,ij->i', y, y)
+
+        mean_yy = 0.0
+        for tile in NormalityTest.tiles(n, tile_size):
+            dist = sq[tile, np.newaxis] + sq[np.newaxis, :] - 2 * np.dot(y[tile], y.T)
+            mean_yy += np.sum(np.sqrt(np.maximum(dist, 0, out=dist)))
+        mean_yy /= n ** 2
+
+        # E|Z - Z'| and E|y - Z| for standard normal Z, the latter through the mean of the
+        # non-central chi distribution
+        const = np.exp(gammaln((d + 1) / 2) - gammaln(d / 2))
+        mean_zz = 2 * const
+        mean_yz = np.mean(np.sqrt(2) * const * hyp1f1(-0.5, d / 2, -sq / 2))
+        return float(n * (2 * mean_yz - mean_zz - mean_yy))
+
+    @staticmethod
+    def bootstrap_statistics(n: int, d: int, seeds: list, tile_size: int = 1024):
+        """
+        Computes E statistics of standard normal samples for the parametric bootstrap, one
+        sample per seed
+
+        Parameters
+        ----------
+        n           : int
+                      number of observations per sample
+        d           : int
+                      dimension of the samples
+        seeds       : list of numpy.random.SeedSequence
+                      seed of every replicate
+        tile_size   : int
+                      number of rows per tile of the n x n distance matrix
+
+        Returns
+        -------
+        Out         : list of float
+                      E statistic of every replicate
+
+        """
+        return [Energy.energy_statistic(np.random.default_rng(seed).standard_normal((n, d)),
+                                        tile_size) for seed in seeds]
+
+    def __init__(self, df: pd.DataFrame, backend: str = 'r', tile_size: int = 1024,
+                 n_jobs: int = -1, seed: int = None, executor: str = 'process'):
         """
         Constructor / Initiate the class
         Parameters
         ----------
-        df      : pandas.DataFrame
-                  df to be analysed
+        df          : pandas.DataFrame
+                      df to be analysed
+        backend     : str
+                      'r' or 'numpy', default is 'r'
+        tile_size   : int
+                      number of rows per tile of the n x n distance matrix
+        n_jobs      : int
+                      number of processes or threads running bootstrap replicates, -1 uses
+                      all cores
+        seed        : int
+                      seed of the bootstrap, results are reproducible for a given seed
+                      regardless of n_jobs, default is None, i.e. fresh entropy
+        executor    : str
+                      'process' or 'thread', threads avoid forking a process that already
+                      runs other threads, e.g. inside NormalityBattery, default is 'process'
 
         """
-        super().__init__(df)
+        super().__init__(df, backend=backend, tile_size=tile_size)
+        if seed is not None:
+            Assertor.evaluate_data_type({seed: int})
+        self.n_jobs = os.cpu_count() if n_jobs == -1 else n_jobs
+        if self.n_jobs < 1:
+            raise ValueError("n_jobs must be -1 or a positive integer, got {}".format(n_jobs))
+        if executor not in ('thread', 'process'):
+            raise ValueError("executor must be 'thread' or 'process', got '{}'".format(executor))
+        self.seed = seed
+        self.executor = executor
 
     def run_e_test(self, boot=100):
         """
         Runs the Energy E test for multivariate normality by delegating the task to the
-        MVN module in r
+        MVN module in r, in a private r environment
+
+        Returns
+        -------
+        Out     : tuple
+                  (e test statistic, p-value)
 
         """
-        r('require("MVN", character.only = TRUE)')
-        r.assign("df", self.df)
-        r('res <- mvn(df, mvnTest = "energy", R = {})'.format(boot))
+        results = RSession.evaluate(
+            'res <- mvn(df, mvnTest = "energy", R = {}); '
+            'c(as.numeric(res$multivariateNormality[2]), '
+            'as.numeric(res$multivariateNormality["p value"]))'.format(boot),
+            df=self.df)
         gc.collect()
+        return tuple(results)
+
+    def run_native_e_test(self, boot=100):
+        """
+        Runs the Energy E test for multivariate normality in numpy. Every bootstrap replicate
+        gets its own SeedSequence stream spawned from the seed, and the replicates are spread
+        across a pool of n_jobs processes or threads.
+
+        Returns
+        -------
+        Out     : tuple
+                  (e test statistic, p-value)
+
+        """
+        n, d = self.data.shape
+        e = self.energy_statistic(self.data, self.tile_size)
+
+        seeds = np.random.SeedSequence(self.seed).spawn(boot)
+        n_jobs = min(self.n_jobs, boot)
+        if n_jobs > 1:
+            chunks = [list(chunk) for chunk in np.array_split(seeds, n_jobs)]
+            pool = ProcessPoolExecutor if self.executor == 'process' else ThreadPoolExecutor
+            with pool(max_workers=n_jobs) as executor:
+                replicates = [stat for chunk_stats in executor.map(
+                    self.bootstrap_statistics, [n] * n_jobs, [d] * n_jobs, chunks,
+                    [self.tile_size] * n_jobs) for stat in chunk_stats]
+        else:
+            replicates = self.bootstrap_statistics(n, d, seeds, self.tile_size)
+
+        p_e = 1 - np.mean(np.array(replicates) < e)
+        return e, float(p_e)
 
     def print_results(self):
         """
@@ -45,7 +177,7 @@ class Energy(NormalityTest):
                   (e test statistic, p-value)
 
         """
-        self.run_e_test()
-        dh = r('as.numeric(res$multivariateNormality[2])')
-        p_dh = r('as.numeric(res$multivariateNormality["p value"])')
-        return tuple(list(dh) + list(p_dh))
+        if self.backend == 'numpy':
+            return self.run_native_e_test()
+
+        return self.run_e_test()
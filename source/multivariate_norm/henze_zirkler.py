@@ -4,9 +4,13 @@ __author__ = 'Samir Adrik'
 __email__ = 'samir.adrik@gmail.com'
 
 from source.multivariate_norm.normality_test import NormalityTest
-from rpy2.robjects import r
+from source.multivariate_norm.r_session import RSession
+from concurrent.futures import ThreadPoolExecutor
+import scipy.stats as stats
 import pandas as pd
+import numpy as np
 import gc
+import os
 
 
 class HenzeZirkler(NormalityTest):
@@ -15,28 +19,104 @@ class HenzeZirkler(NormalityTest):
 
     """
 
-    def __init__(self, df: pd.DataFrame):
+    backends = ('r', 'numpy')
+
+    def __init__(self, df: pd.DataFrame, backend: str = 'r', tile_size: int = 1024,
+                 n_jobs: int = -1):
         """
         Constructor / Initiate the class
 
         Parameters
         ----------
-        df      : pandas.DataFrame
-                  df to be analysed
+        df          : pandas.DataFrame
+                      df to be analysed
+        backend     : str
+                      'r' or 'numpy', default is 'r'
+        tile_size   : int
+                      number of rows and columns per block of the n x n pairwise kernel
+                      matrix, bounds the memory per thread to tile_size x tile_size
+        n_jobs      : int
+                      number of threads summing the kernel tiles, -1 uses all cores
 
         """
-        super().__init__(df)
+        super().__init__(df, backend=backend, tile_size=tile_size)
+        self.n_jobs = os.cpu_count() if n_jobs == -1 else n_jobs
+        if self.n_jobs < 1:
+            raise ValueError("n_jobs must be -1 or a positive integer, got {}".format(n_jobs))
 
     def run_hz_test(self):
         """
         Runs the Henze-Zirkler test for multivariate normality by delegating the task to the
-        MVN module in r
+        MVN module in r, in a private r environment
+
+        Returns
+        -------
+        Out     : tuple
+                  (hz test statistic, p-value)
 
         """
-        r('require("MVN", character.only = TRUE)')
-        r.assign("df", self.df)
-        r('res <- mvn(df, mvnTest = "hz")')
+        results = RSession.evaluate(
+            'res <- mvn(df, mvnTest = "hz"); '
+            'c(as.numeric(res$multivariateNormality["HZ"]), '
+            'as.numeric(res$multivariateNormality["p value"]))',
+            df=self.df)
         gc.collect()
+        return tuple(results)
+
+    def run_native_hz_test(self):
+        """
+        Runs the Henze-Zirkler test for multivariate normality in numpy. The double sum of the
+        Gaussian kernel over all pairs of observations is computed in tile_size x tile_size
+        blocks, the rows of blocks are spread across a thread pool, so that the memory per
+        thread does not grow with n. The p-value is from the log-normal approximation.
+
+        Returns
+        -------
+        Out     : tuple
+                  (hz test statistic, p-value)
+
+        """
+        n, p = self.data.shape
+        xc, s = self.centered_covariance(self.data)
+        b = 1 / np.sqrt(2) * ((2 * p + 1) / 4) ** (1 / (p + 4)) * n ** (1 / (p + 4))
+
+        if np.linalg.matrix_rank(s) == p:
+            xs = np.dot(xc, np.linalg.inv(s))
+            dj = np.einsum('ij,ij->i', xs, xc)
+
+            def kernel_sum(tile):
+                total = 0.0
+                for block in self.tiles(n, self.tile_size):
+                    djk = np.dot(xs[tile], xc[block].T)
+                    djk *= -2
+                    djk += dj[tile, np.newaxis]
+                    djk += dj[np.newaxis, block]
+                    djk *= -b ** 2 / 2
+                    total += np.sum(np.exp(djk, out=djk))
+                return total
+
+            with ThreadPoolExecutor(max_workers=self.n_jobs) as executor:
+                pair_sum = sum(executor.map(kernel_sum, self.tiles(n, self.tile_size)))
+
+            hz = n * (pair_sum / n ** 2
+                      - 2 * (1 + b ** 2) ** (-p / 2)
+                      * np.mean(np.exp(-b ** 2 / (2 * (1 + b ** 2)) * dj))
+                      + (1 + 2 * b ** 2) ** (-p / 2))
+        else:
+            hz = n * 4
+
+        wb = (1 + b ** 2) * (1 + 3 * b ** 2)
+        a = 1 + 2 * b ** 2
+        mu = 1 - a ** (-p / 2) * (1 + p * b ** 2 / a + (p * (p + 2) * b ** 4) / (2 * a ** 2))
+        si2 = (2 * (1 + 4 * b ** 2) ** (-p / 2)
+               + 2 * a ** (-p) * (1 + (2 * p * b ** 4) / a ** 2
+                                  + (3 * p * (p + 2) * b ** 8) / (4 * a ** 4))
+               - 4 * wb ** (-p / 2) * (1 + (3 * p * b ** 4) / (2 * wb)
+                                       + (p * (p + 2) * b ** 8) / (2 * wb ** 2)))
+        pmu = np.log(np.sqrt(mu ** 4 / (si2 + mu ** 2)))
+        psi = np.sqrt(np.log((si2 + mu ** 2) / mu ** 2))
+        p_hz = stats.lognorm.sf(hz, psi, scale=np.exp(pmu))
+        return float(hz), float(p_hz)
 
     def print_results(self):
         """
@@ -48,7 +128,7 @@ class HenzeZirkler(NormalityTest):
                   (hz test statistic, p-value)
 
         """
-        self.run_hz_test()
-        hz = r('as.numeric(res$multivariateNormality["HZ"])')
-        p_hz = r('as.numeric(res$multivariateNormality["p value"])')
-        return tuple(list(hz) + list(p_hz))
+        if self.backend == 'numpy':
+            return self.run_native_hz_test()
+
+        return self.run_hz_test()
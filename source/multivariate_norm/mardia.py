@@ -4,8 +4,10 @@ __author__ = 'Samir Adrik'
 __email__ = 'samir.adrik@gmail.com'
 
 from source.multivariate_norm.normality_test import NormalityTest
-from rpy2.robjects import r
+from source.multivariate_norm.r_session import RSession
+import scipy.stats as stats
 import pandas as pd
+import numpy as np
 import gc
 
 
@@ -14,27 +16,80 @@ class Mardia(NormalityTest):
     Implements the Mardia test for multivariate normality
     """
 
-    def __init__(self, df: pd.DataFrame):
+    backends = ('r', 'numpy')
+
+    def __init__(self, df: pd.DataFrame, backend: str = 'r', tile_size: int = 1024):
         """
         Constructor / Initiate the class
         Parameters
         ----------
-        df      : pandas.DataFrame
-                  df to be analysed
+        df          : pandas.DataFrame
+                      df to be analysed
+        backend     : str
+                      'r' or 'numpy', default is 'r'
+        tile_size   : int
+                      number of rows per tile of the n x n Mahalanobis cross-product matrix
 
         """
-        super().__init__(df)
+        super().__init__(df, backend=backend, tile_size=tile_size)
 
     def run_mardia_test(self):
         """
         Runs the Mardia test for multivariate normality by delegating the task to the
-        MVN module in r
+        MVN module in r, in a private r environment
+
+        Returns
+        -------
+        Out     : tuple
+                  (mardia_skew test statistic, p-value,
+                   mardia_kurt test statistic, p-value)
 
         """
-        r('require("MVN", character.only = TRUE)')
-        r.assign("df", self.df)
-        r('res <- mvn(df, mvnTest = "mardia")')
+        results = RSession.evaluate(
+            'res <- mvn(df, mvnTest = "mardia"); '
+            'c(as.numeric(as.vector(res$multivariateNormality[1, "Statistic"])), '
+            'as.numeric(as.vector(res$multivariateNormality[1, "p value"])), '
+            'as.numeric(as.vector(res$multivariateNormality[2, "Statistic"])), '
+            'as.numeric(as.vector(res$multivariateNormality[2, "p value"])))', df=self.df)
         gc.collect()
+        return tuple(results)
+
+    def run_native_mardia_test(self):
+        """
+        Runs the Mardia test for multivariate normality in numpy. The n x n Mahalanobis
+        cross-product matrix is never materialized, only tile_size x n tiles of it are.
+
+        Returns
+        -------
+        Out     : tuple
+                  (mardia_skew test statistic, p-value,
+                   mardia_kurt test statistic, p-value)
+
+        """
+        n, p = self.data.shape
+        xc, s = self.centered_covariance(self.data)
+        s_inv = np.linalg.inv(s)
+
+        g1p, g2p = 0.0, 0.0
+        for tile in self.tiles(n, self.tile_size):
+            xs = np.dot(xc[tile], s_inv)
+            d = np.dot(xs, xc.T)
+            g1p += np.sum(d * d * d)
+            g2p += np.sum(np.einsum('ij,ij->i', xs, xc[tile]) ** 2)
+        g1p /= n ** 2
+        g2p /= n
+
+        df = p * (p + 1) * (p + 2) / 6
+        if n < 20:
+            k = ((p + 1) * (n + 1) * (n + 3)) / (n * ((n + 1) * (p + 1) - 6))
+            skew = n * k * g1p / 6
+        else:
+            skew = n * g1p / 6
+        p_skew = stats.chi2.sf(skew, df)
+
+        kurt = (g2p - p * (p + 2)) * np.sqrt(n / (8 * p * (p + 2)))
+        p_kurt = 2 * stats.norm.sf(abs(kurt))
+        return float(skew), float(p_skew), float(kurt), float(p_kurt)
 
     def print_results(self):
         """
@@ -46,9 +101,7 @@ class Mardia(NormalityTest):
                   (mardia_skew test statistic, p-value,
                    mardia_kurt test statistic, p-value)
         """
-        self.run_mardia_test()
-        m_skew = r('as.numeric(as.vector(res$multivariateNormality[1, "Statistic"]))')
-        p_skew = r('as.numeric(as.vector(res$multivariateNormality[1, "p value"]))')
-        m_kurt = r('as.numeric(as.vector(res$multivariateNormality[2, "Statistic"]))')
-        p_kurt = r('as.numeric(as.vector(res$multivariateNormality[2, "p value"]))')
-        return tuple(list(m_skew) + list(p_skew) + list(m_kurt) + list(p_kurt))
+        if self.backend == 'numpy':
+            return self.run_native_mardia_test()
+
+        return self.run_mardia_test()
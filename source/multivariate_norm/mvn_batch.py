@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+__author__ = 'Samir Adrik'
+__email__ = 'samir.adrik@gmail.com'
+
+from source.multivariate_norm.normality_test import NormalityTest
+from source.multivariate_norm.r_session import RSession
+import pandas as pd
+import gc
+
+
+class MvnBatch(NormalityTest):
+    """
+    Runs several multivariate normality tests of the MVN module in r in a single r evaluation
+
+    """
+
+    # name: (mvnTest, r expression extracting the statistics and p-values from res)
+    mvn_tests = {
+        'mardia': ('mardia',
+                   'as.numeric(as.vector(res$multivariateNormality[1, "Statistic"])), '
+                   'as.numeric(as.vector(res$multivariateNormality[1, "p value"])), '
+                   'as.numeric(as.vector(res$multivariateNormality[2, "Statistic"])), '
+                   'as.numeric(as.vector(res$multivariateNormality[2, "p value"]))'),
+        'royston': ('royston',
+                    'as.numeric(res$multivariateNormality["H"]), '
+                    'as.numeric(res$multivariateNormality["p value"])'),
+        'henze-zirkler': ('hz',
+                          'as.numeric(res$multivariateNormality["HZ"]), '
+                          'as.numeric(res$multivariateNormality["p value"])'),
+        'doornik-hansen': ('dh',
+                           'as.numeric(res$multivariateNormality["E"]), '
+                           'as.numeric(res$multivariateNormality["p value"])'),
+        'energy': ('energy',
+                   'as.numeric(res$multivariateNormality[2]), '
+                   'as.numeric(res$multivariateNormality["p value"])')
+    }
+
+    def __init__(self, df: pd.DataFrame, tests: tuple = tuple(mvn_tests), boot: int = 100):
+        """
+        Constructor / Initiate the class
+
+        Parameters
+        ----------
+        df      : pandas.DataFrame
+                  df to be analysed
+        tests   : tuple of str
+                  names of the tests to run, i.e. any of 'mardia', 'royston', 'henze-zirkler',
+                  'doornik-hansen' and 'energy', default is all of them
+        boot    : int
+                  number of bootstrap replicates of the energy test
+
+        """
+        unknown = [test for test in tests if test not in self.mvn_tests]
+        if unknown:
+            raise ValueError("unknown multivariate normality tests {}, expected any of "
+                             "{}".format(unknown, tuple(self.mvn_tests)))
+        super().__init__(df)
+        self.tests = tuple(tests)
+        self.boot = boot
+
+    def run_mvn_batch(self):
+        """
+        Transfers df to r once and runs all tests in a single r evaluation, in a private r
+        environment
+
+        Returns
+        -------
+        Out     : list of float
+                  statistics and p-values of all tests, in the order of the tests
+
+        """
+        calls = []
+        for test in self.tests:
+            mvn_test, extract = self.mvn_tests[test]
+            boot = ', R = {}'.format(self.boot) if mvn_test == 'energy' else ''
+            calls.append('{{res <- mvn(df, mvnTest = "{}"{}); c({})}}'.format(
+                mvn_test, boot, extract))
+
+        results = RSession.evaluate('c({})'.format(', '.join(calls)), df=self.df)
+        gc.collect()
+        return results
+
+    def print_results(self):
+        """
+        Gets the test statistics and p-values of all tests
+
+        Returns
+        -------
+        Out     : dict
+                  {test name: (test statistic, p-value, ...)} with the same tuples as the
+                  print_results() method of the single tests
+
+        """
+        results = self.run_mvn_batch()
+        batch, start = {}, 0
+        for test in self.tests:
+            size = 4 if test == 'mardia' else 2
+            batch[test] = tuple(results[start:start + size])
+            start += size
+        return batch
@@ -4,8 +4,8 @@ __author__ = 'Samir Adrik'
 __email__ = 'samir.adrik@gmail.com'
 
 from source.exceptions.base_class_cannot_be_instantiated import BaseClassCannotBeInstantiated
+from source.multivariate_norm.r_session import RSession
 from source.util.assertor import Assertor
-from rpy2.robjects import r, numpy2ri
 import pandas as pd
 import numpy as np
 import gc
@@ -17,14 +17,64 @@ class NormalityTest:
 
     """
 
-    def __init__(self, df: pd.DataFrame = None):
+    backends = ('r',)
+
+    @staticmethod
+    def tiles(n: int, tile_size: int):
+        """
+        Split the row indices 0, ..., n - 1 into consecutive tiles of at most tile_size rows
+
+        Parameters
+        ----------
+        n           : int
+                      number of rows
+        tile_size   : int
+                      maximum number of rows in a tile
+
+        Returns
+        -------
+        Out         : generator of slice
+                      slices covering all n rows in order
+
+        """
+        for start in range(0, n, tile_size):
+            yield slice(start, min(start + tile_size, n))
+
+    @staticmethod
+    def centered_covariance(x: np.ndarray):
+        """
+        Centers the data and computes the maximum likelihood covariance matrix, i.e.
+        ((n - 1) / n) * cov(x), as is done in the MVN module in r
+
+        Parameters
+        ----------
+        x       : numpy.ndarray
+                  n x p array of observations
+
+        Returns
+        -------
+        Out     : tuple
+                  (centered data, covariance matrix)
+
+        """
+        xc = x - x.mean(axis=0)
+        return xc, np.dot(xc.T, xc) / x.shape[0]
+
+    def __init__(self, df: pd.DataFrame = None, backend: str = 'r', tile_size: int = 1024):
         """
         Constructor / Initiate the class
 
         Parameters
         ----------
-        df      : pandas.DataFrame
-                  df to be analysed
+        df          : pandas.DataFrame
+                      df to be analysed
+        backend     : str
+                      'r' to delegate the test to the MVN module in r or 'numpy' to run the
+                      native implementation, default is 'r'. r is only started, and MVN
+                      only probed, the first time an 'r' test is constructed
+        tile_size   : int
+                      number of rows per tile when native implementations build n x n
+                      cross-product matrices, bounds memory to tile_size x n
 
         """
         if type(self) == NormalityTest:
@@ -32,7 +82,24 @@ class NormalityTest:
                 "base class '{}' cannot be instantiated".format(self.__class__.__name__))
 
         Assertor.evaluate_pd_dataframe(df)
-        r('if (!is.element("MVN", installed.packages()[,1])){ '
-          'install.packages("MVN", dep = TRUE)}')
-        self.df = numpy2ri.numpy2ri(np.array(df))
+        Assertor.evaluate_data_type({backend: str, tile_size: int})
+        if backend not in self.backends:
+            raise ValueError("backend of '{}' must be one of {}, got '{}'".format(
+                self.__class__.__name__, self.backends, backend))
+        if tile_size < 1:
+            raise ValueError("tile_size must be a positive integer, got {}".format(tile_size))
+
+        self.backend = backend
+        self.tile_size = tile_size
+
+        # float32 and float64 values, e.g. the shared buffer of a NormalityBattery, are not copied
+        data = np.asarray(df)
+        if data.dtype not in (np.float32, np.float64):
+            data = data.astype(np.float64)
+
+        if backend == 'numpy':
+            self.data = data
+        else:
+            RSession.require_mvn()
+            self.df = RSession.matrix(data)
         gc.collect()
@@ -0,0 +1,353 @@
+# -*- coding: utf-8 -*-
+
+__author__ = 'Samir Adrik'
+__email__ = 'samir.adrik@gmail.com'
+
+from source.exceptions.base_class_cannot_be_instantiated import BaseClassCannotBeInstantiated
+from concurrent.futures import Future
+from collections import OrderedDict
+import numpy as np
+import threading
+import hashlib
+import weakref
+import queue
+
+
+class RSession:
+    """
+    Embedded r session shared by all r backed normality tests. rpy2 and r are only started the
+    first time a test needs them, and the MVN module is probed once per process. The
+    interpreter is owned by a single dispatcher thread, every call into r is queued to it and
+    the callers wait for its result, so that any number of threads can share one r runtime.
+    Code is evaluated in a private r environment per call, nothing is written to the global
+    environment. Arrays are transferred to r with a single copy into r's memory, and the r
+    matrix is reused for arrays with the same values as long as the array it was made from is
+    alive. Arrays must not be modified in place while their r matrix is in use.
+
+    """
+
+    _r = None
+    _mvn_loaded = False
+    _lock = threading.Lock()
+    _queue = queue.Queue()
+    _dispatcher = None
+    _matrices = OrderedDict()
+    _views = OrderedDict()
+    _matrix_lock = threading.RLock()
+    max_matrices = 8
+    max_views = 64
+
+    @classmethod
+    def dispatch(cls):
+        """
+        Loop of the dispatcher thread, runs the queued calls one after another
+
+        """
+        while True:
+            future, function, args = cls._queue.get()
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(function(*args))
+                except BaseException as e:
+                    future.set_exception(e)
+
+    @classmethod
+    def submit(cls, function, *args):
+        """
+        Queues a call to the dispatcher thread, which is started on first use
+
+        Parameters
+        ----------
+        function    : callable
+                      function using r
+        args        : tuple
+                      arguments of function
+
+        Returns
+        -------
+        Out         : concurrent.futures.Future
+                      future of the result of function(*args), can be awaited in asyncio
+                      with asyncio.wrap_future()
+
+        """
+        with cls._lock:
+            if cls._dispatcher is None:
+                cls._dispatcher = threading.Thread(target=cls.dispatch, name='r-dispatcher',
+                                                   daemon=True)
+                cls._dispatcher.start()
+        future = Future()
+        cls._queue.put((future, function, args))
+        return future
+
+    @classmethod
+    def call(cls, function, *args):
+        """
+        Runs function on the dispatcher thread and waits for its result, calls made by the
+        dispatcher thread itself run directly
+
+        Parameters
+        ----------
+        function    : callable
+                      function using r
+        args        : tuple
+                      arguments of function
+
+        Returns
+        -------
+        Out         : object
+                      result of function(*args)
+
+        """
+        if threading.current_thread() is cls._dispatcher:
+            return function(*args)
+        return cls.submit(function, *args).result()
+
+    @classmethod
+    def r(cls):
+        """
+        Gets the embedded r interpreter, starting it on the dispatcher thread on first use. The
+        interpreter must only be used in functions run by call()
+
+        Returns
+        -------
+        Out     : rpy2.robjects.R
+                  embedded r interpreter
+
+        """
+        if cls._r is None:
+            cls.call(cls.start)
+        return cls._r
+
+    @classmethod
+    def start(cls):
+        """
+        Starts r, runs on the dispatcher thread
+
+        """
+        if cls._r is None:
+            from rpy2.robjects import r
+            cls._r = r
+
+    @classmethod
+    def require_mvn(cls):
+        """
+        Installs the MVN module in r if it is missing and loads it, only the first call in a
+        process does any work
+
+        """
+        if not cls._mvn_loaded:
+            cls.call(cls.load_mvn)
+
+    @classmethod
+    def load_mvn(cls):
+        """
+        Installs and loads the MVN module, runs on the dispatcher thread
+
+        """
+        if not cls._mvn_loaded:
+            r = cls.r()
+            r('if (!requireNamespace("MVN", quietly = TRUE)){ '
+              'install.packages("MVN", dep = TRUE)}')
+            r('suppressMessages(require("MVN", character.only = TRUE))')
+            cls._mvn_loaded = True
+
+    @classmethod
+    def evaluate(cls, code: str, **variables):
+        """
+        Evaluates r code in a new environment holding variables, on the dispatcher thread.
+        Assignments in code, e.g. res <- mvn(df), stay in that environment, so concurrent
+        calls cannot see or overwrite each other's variables.
+
+        Parameters
+        ----------
+        code        : str
+                      r code, whose last value must be a numeric vector
+        variables   : dict
+                      {name: r object} bound in the environment of the call
+
+        Returns
+        -------
+        Out         : list of float
+                      value of code
+
+        """
+        return cls.call(cls.evaluate_in_environment, code, variables)
+
+    @classmethod
+    def evaluate_in_environment(cls, code: str, variables: dict):
+        """
+        Evaluates code in a new environment, runs on the dispatcher thread, see evaluate()
+
+        Parameters
+        ----------
+        code        : str
+                      r code, whose last value must be a numeric vector
+        variables   : dict
+                      {name: r object} bound in the environment of the call
+
+        Returns
+        -------
+        Out         : list of float
+                      value of code
+
+        """
+        r = cls.r()
+        environment = r['new.env']()
+        for name, value in variables.items():
+            environment[name] = value
+        return [float(value) for value in r['eval'](r['parse'](text=code), envir=environment)]
+
+    @staticmethod
+    def matrix_key(array: np.ndarray):
+        """
+        Identifies the memory an array views, i.e. the array owning the memory together with
+        the address, shape, strides and dtype of the view, without reading the values
+
+        Parameters
+        ----------
+        array   : numpy.ndarray
+                  2-D array
+
+        Returns
+        -------
+        Out     : tuple
+                  (owner, key), key is only unique while owner is alive
+
+        """
+        owner = array
+        while isinstance(owner.base, np.ndarray):
+            owner = owner.base
+        return owner, (id(owner), array.__array_interface__['data'][0], array.shape,
+                       array.strides, array.dtype.str)
+
+    @staticmethod
+    def matrix_digest(array: np.ndarray):
+        """
+        Hashes the shape, dtype and values of an array in its memory order. Contiguous arrays
+        are hashed in place, other arrays in blocks of rows of about 1 MiB
+
+        Parameters
+        ----------
+        array   : numpy.ndarray
+                  2-D array
+
+        Returns
+        -------
+        Out     : str
+                  hex digest identifying the values of array
+
+        """
+        fortran = array.flags.f_contiguous and not array.flags.c_contiguous
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update("{}{}{}".format(array.shape, array.dtype.str, 'F' if fortran else 'C')
+                      .encode())
+        if fortran or array.flags.c_contiguous:
+            digest.update(memoryview(array.T if fortran else array).cast('B'))
+        else:
+            rows = max(2 ** 20 // max(array.shape[1] * array.itemsize, 1), 1)
+            for start in range(0, array.shape[0], rows):
+                digest.update(np.ascontiguousarray(array[start:start + rows]).data)
+        return digest.hexdigest()
+
+    @classmethod
+    def forget(cls, view: tuple, key: str):
+        """
+        Drops the view of an array owning memory that has been garbage collected, and its r
+        matrix unless another live array has the same values, called by weakref.finalize
+
+        Parameters
+        ----------
+        view    : tuple
+                  matrix_key() of the array
+        key     : str
+                  matrix_digest() of the array
+
+        """
+        with cls._matrix_lock:
+            cls._views.pop(view, None)
+            if key not in cls._views.values():
+                cls._matrices.pop(key, None)
+
+    @classmethod
+    def matrix(cls, array: np.ndarray):
+        """
+        Converts a 2-D numpy.ndarray into an r matrix. The r vector is allocated once and the
+        values are written into its column-major memory in a single pass, whatever the order
+        and float dtype of array. The matrix is cached until the array owning the memory is
+        garbage collected, so that all tests and batteries on the same data share one r
+        object. The cache is looked up by the memory array views first, and only if that is
+        new by the digest of its values.
+
+        Parameters
+        ----------
+        array   : numpy.ndarray
+                  n x p array of observations
+
+        Returns
+        -------
+        Out     : rpy2.rinterface.FloatSexpVector
+                  r matrix holding the values of array as double
+
+        """
+        if array.ndim != 2:
+            raise ValueError("array must be 2-dimensional, got shape {}".format(array.shape))
+
+        owner, view = cls.matrix_key(array)
+        with cls._matrix_lock:
+            key = cls._views.get(view)
+            if key in cls._matrices:
+                cls._views.move_to_end(view)
+                cls._matrices.move_to_end(key)
+                return cls._matrices[key]
+
+        key = cls.matrix_digest(array)
+        with cls._matrix_lock:
+            matrix = cls._matrices.get(key)
+        if matrix is None:
+            matrix = cls.call(cls.allocate_matrix, array)
+
+        with cls._matrix_lock:
+            if view not in cls._views:
+                weakref.finalize(owner, cls.forget, view, key)
+            cls._views[view] = key
+            cls._matrices[key] = matrix
+            cls._matrices.move_to_end(key)
+            while len(cls._matrices) > cls.max_matrices:
+                cls._matrices.popitem(last=False)
+            while len(cls._views) > cls.max_views:
+                cls._views.popitem(last=False)
+        return matrix
+
+    @classmethod
+    def allocate_matrix(cls, array: np.ndarray):
+        """
+        Allocates an r matrix and fills it with the values of array, runs on the dispatcher
+        thread, see matrix()
+
+        Parameters
+        ----------
+        array   : numpy.ndarray
+                  n x p array of observations
+
+        Returns
+        -------
+        Out     : rpy2.rinterface.FloatSexpVector
+                  r matrix holding the values of array as double
+
+        """
+        r = cls.r()
+        import rpy2.rinterface as ri
+        n, p = array.shape
+        matrix = r['numeric'](n * p)
+        np.ndarray((n, p), dtype=np.float64, buffer=matrix.memoryview(), order='F')[:] = array
+        matrix.do_slot_assign('dim', ri.IntSexpVector([n, p]))
+        return matrix
+
+    def __init__(self):
+        """
+        Constructor / Instantiating the class
+
+        """
+        if type(self) == RSession:
+            raise BaseClassCannotBeInstantiated(
+                "base class '{}' cannot be instantiated".format(self.__class__.__name__))
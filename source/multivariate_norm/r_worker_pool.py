@@ -0,0 +1,356 @@
+# -*- coding: utf-8 -*-
+
+__author__ = 'Samir Adrik'
+__email__ = 'samir.adrik@gmail.com'
+
+from concurrent.futures import ThreadPoolExecutor
+from source.multivariate_norm.r_session import RSession
+from source.multivariate_norm.mvn_batch import MvnBatch
+from source.util.assertor import Assertor
+import multiprocessing
+import pandas as pd
+import numpy as np
+import threading
+import atexit
+import queue
+
+
+class RWorkerPool:
+    """
+    Pool of long-lived worker processes, each with its own embedded r session in which the MVN
+    module is loaded once, so that the r backed multivariate normality tests run concurrently.
+    The df is placed once in shared memory, from which every worker reads it. A worker that
+    crashes or does not answer within timeout is replaced by a fresh one and the test retried.
+
+    """
+
+    _shared = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def serve(connection, initializer):
+        """
+        Loop of a worker process, runs initializer once and then the (function, args) tasks
+        received over connection until it receives None or the connection is closed
+
+        Parameters
+        ----------
+        connection  : multiprocessing.connection.Connection
+                      worker end of the pipe to the pool
+        initializer : callable
+                      prepares the worker, e.g. starts r and loads MVN, None to skip
+
+        """
+        try:
+            if initializer is not None:
+                initializer()
+        except Exception as e:
+            connection.send(('error', RuntimeError("starting r worker failed with: "
+                                                   "{}: {}".format(type(e).__name__, e))))
+            return
+        connection.send(('ready', None))
+
+        while True:
+            try:
+                task = connection.recv()
+            except EOFError:
+                break
+            if task is None:
+                break
+            function, args = task
+            try:
+                connection.send(('ok', function(*args)))
+            except Exception as e:
+                connection.send(('error', RuntimeError("{}: {}".format(type(e).__name__, e))))
+
+    @staticmethod
+    def run_test(name: str, shape: tuple, test: str, boot: int):
+        """
+        Runs a single MVN test in a worker on the df in shared memory
+
+        Parameters
+        ----------
+        name    : str
+                  name of the shared memory block holding the float64 values of the df
+        shape   : tuple
+                  shape of the df
+        test    : str
+                  name of the test, see MvnBatch.mvn_tests
+        boot    : int
+                  number of bootstrap replicates of the energy test
+
+        Returns
+        -------
+        Out     : tuple of float
+                  same tuple as the print_results() method of the single test
+
+        """
+        from multiprocessing import shared_memory
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            df = pd.DataFrame(np.ndarray(shape, dtype=np.float64, buffer=shm.buf), copy=False)
+            results = MvnBatch(df, tests=(test,), boot=boot).print_results()[test]
+            del df
+            return tuple(float(result) for result in results)
+        finally:
+            shm.close()
+
+    @classmethod
+    def shared(cls, n_workers: int):
+        """
+        Gets the pool shared by all multivariate normality tests of the process requesting
+        n_workers, one pool is kept per number of workers so that a pool is never shut down
+        while other threads may be running tests on it, the workers are only started on first
+        use and all pools are shut down at exit
+
+        Parameters
+        ----------
+        n_workers   : int
+                      number of worker processes
+
+        Returns
+        -------
+        Out         : RWorkerPool
+                      shared pool
+
+        """
+        with cls._lock:
+            if n_workers not in cls._shared:
+                if not cls._shared:
+                    atexit.register(lambda: [pool.shutdown() for pool in cls._shared.values()])
+                cls._shared[n_workers] = cls(n_workers)
+            return cls._shared[n_workers]
+
+    def __init__(self, n_workers: int = 2, timeout: float = 600.0,
+                 startup_timeout: float = 1800.0, initializer=RSession.require_mvn):
+        """
+        Constructor / Initiate the class
+
+        Parameters
+        ----------
+        n_workers       : int
+                          number of worker processes, default is 2
+        timeout         : float
+                          seconds a test may run before its worker is considered hung,
+                          default is 600
+        startup_timeout : float
+                          seconds a worker may take to start r and, if missing, install
+                          MVN, default is 1800
+        initializer     : callable
+                          run once in every worker before the first test, default loads
+                          MVN in the r session of the worker
+
+        """
+        Assertor.evaluate_data_type({n_workers: int})
+        if n_workers < 1:
+            raise ValueError("n_workers must be a positive integer, got {}".format(n_workers))
+        if timeout <= 0 or startup_timeout <= 0:
+            raise ValueError("timeout and startup_timeout must be positive, got {} and "
+                             "{}".format(timeout, startup_timeout))
+
+        self.n_workers = n_workers
+        self.timeout = timeout
+        self.startup_timeout = startup_timeout
+        self.initializer = initializer
+        self.context = multiprocessing.get_context('spawn')
+        self.closed = False
+        self.lock = threading.Lock()
+        self.idle = queue.Queue()
+        for _ in range(n_workers):
+            self.idle.put(self.start_worker())
+
+    def start_worker(self):
+        """
+        Starts a worker process, which is only waited for when it gets its first task
+
+        Returns
+        -------
+        Out     : list
+                  [process, connection, ready]
+
+        """
+        connection, worker_connection = self.context.Pipe()
+        process = self.context.Process(target=RWorkerPool.serve,
+                                       args=(worker_connection, self.initializer), daemon=True)
+        process.start()
+        worker_connection.close()
+        return [process, connection, False]
+
+    @staticmethod
+    def stop_worker(worker: list):
+        """
+        Terminates a worker process and closes its connection
+
+        Parameters
+        ----------
+        worker  : list
+                  [process, connection, ready]
+
+        """
+        process, connection, _ = worker
+        if process.is_alive():
+            process.terminate()
+            process.join(5)
+        if process.is_alive():
+            process.kill()
+            process.join()
+        connection.close()
+
+    @staticmethod
+    def receive(worker: list, timeout: float):
+        """
+        Receives the next message of a worker
+
+        Parameters
+        ----------
+        worker  : list
+                  [process, connection, ready]
+        timeout : float
+                  seconds to wait for the message
+
+        Returns
+        -------
+        Out     : tuple
+                  (status, value)
+
+        """
+        if not worker[1].poll(timeout):
+            raise TimeoutError("r worker did not answer within {} seconds".format(timeout))
+        return worker[1].recv()
+
+    def call(self, task: tuple, retries: int = 1):
+        """
+        Runs a task on the next idle worker, a worker that crashes or hangs is replaced and
+        the task retried on the new worker
+
+        Parameters
+        ----------
+        task    : tuple
+                  (function, args), function must be picklable
+        retries : int
+                  number of times the task is retried after its worker crashed or hung
+
+        Returns
+        -------
+        Out     : object
+                  result of function(*args)
+
+        """
+        if self.closed:
+            raise RuntimeError("r worker pool has been shut down")
+        worker = self.idle.get()
+        try:
+            for attempt in range(retries + 1):
+                try:
+                    if not worker[2]:
+                        status, value = self.receive(worker, self.startup_timeout)
+                        if status == 'error':
+                            raise value
+                        worker[2] = True
+                    worker[1].send(task)
+                    status, value = self.receive(worker, self.timeout)
+                except (EOFError, OSError, TimeoutError) as e:
+                    self.stop_worker(worker)
+                    worker = self.start_worker()
+                    if attempt == retries:
+                        raise RuntimeError("r worker crashed or hung {} times running "
+                                           "{}".format(retries + 1, task[0].__name__)) from e
+                    continue
+                if status == 'error':
+                    raise value
+                return value
+        finally:
+            self.release(worker)
+
+    def release(self, worker: list):
+        """
+        Hands a worker back to the pool after a task, or stops it if the pool has been shut
+        down while the task was running
+
+        Parameters
+        ----------
+        worker  : list
+                  [process, connection, ready]
+
+        """
+        with self.lock:
+            if not self.closed:
+                self.idle.put(worker)
+                return
+        self.stop_worker(worker)
+
+    def map(self, tasks: list):
+        """
+        Runs tasks concurrently on the workers
+
+        Parameters
+        ----------
+        tasks   : list of tuple
+                  (function, args) tasks
+
+        Returns
+        -------
+        Out     : list
+                  results in the order of tasks
+
+        """
+        with ThreadPoolExecutor(max_workers=self.n_workers) as pool:
+            return list(pool.map(self.call, tasks))
+
+    def run(self, df: pd.DataFrame, tests: tuple = tuple(MvnBatch.mvn_tests), boot: int = 100):
+        """
+        Runs the MVN tests concurrently on df, the energy test with its bootstrap is started
+        first
+
+        Parameters
+        ----------
+        df      : pandas.DataFrame
+                  df to be analysed
+        tests   : tuple of str
+                  names of the tests to run, default is all tests of MvnBatch
+        boot    : int
+                  number of bootstrap replicates of the energy test
+
+        Returns
+        -------
+        Out     : dict
+                  {test name: (test statistic, p-value, ...)} like MvnBatch.print_results()
+
+        """
+        unknown = [test for test in tests if test not in MvnBatch.mvn_tests]
+        if unknown:
+            raise ValueError("unknown multivariate normality tests {}, expected any of "
+                             "{}".format(unknown, tuple(MvnBatch.mvn_tests)))
+
+        from multiprocessing import shared_memory
+        values = np.asarray(df)
+        shm = shared_memory.SharedMemory(create=True, size=max(values.size * 8, 1))
+        try:
+            np.ndarray(values.shape, dtype=np.float64, buffer=shm.buf)[:] = values
+            order = sorted(tests, key=lambda test: test != 'energy')
+            results = self.map([(RWorkerPool.run_test, (shm.name, values.shape, test, boot))
+                                for test in order])
+        finally:
+            shm.close()
+            shm.unlink()
+        return {test: dict(zip(order, results))[test] for test in tests}
+
+    def shutdown(self):
+        """
+        Stops all idle workers, the workers busy with a task are stopped as soon as the task
+        is done
+
+        """
+        with self.lock:
+            self.closed = True
+        while True:
+            try:
+                worker = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                worker[1].send(None)
+                worker[0].join(1)
+            except OSError:
+                pass
+            self.stop_worker(worker)
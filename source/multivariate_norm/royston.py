@@ -4,8 +4,10 @@ __author__ = 'Samir Adrik'
 __email__ = 'samir.adrik@gmail.com'
 
 from source.multivariate_norm.normality_test import NormalityTest
-from rpy2.robjects import r
+from source.multivariate_norm.r_session import RSession
+import scipy.stats as stats
 import pandas as pd
+import numpy as np
 import gc
 
 
@@ -15,7 +17,34 @@ class Royston(NormalityTest):
 
     """
 
-    def __init__(self, df: pd.DataFrame):
+    backends = ('r', 'numpy')
+
+    @staticmethod
+    def shapiro_francia(x: np.ndarray):
+        """
+        Computes the Shapiro-Francia W' statistic of every column of x at once, i.e. the squared
+        correlation between the sorted column and the expected normal order statistics
+
+        Parameters
+        ----------
+        x       : numpy.ndarray
+                  n x k array of observations
+
+        Returns
+        -------
+        Out     : numpy.ndarray
+                  W' statistic per column
+
+        """
+        n = x.shape[0]
+        m = stats.norm.ppf((np.arange(1, n + 1) - 3 / 8) / (n + 1 / 4))
+        m -= m.mean()
+        xs = np.sort(x, axis=0)
+        xs -= xs.mean(axis=0)
+        corr = np.dot(m, xs) / (np.linalg.norm(m) * np.linalg.norm(xs, axis=0))
+        return corr ** 2
+
+    def __init__(self, df: pd.DataFrame, backend: str = 'r', sw: np.ndarray = None):
         """
         Constructor / Initiate the class
 
@@ -23,20 +52,82 @@ class Royston(NormalityTest):
         ----------
         df      : pandas.DataFrame
                   df to be analysed
+        backend : str
+                  'r' or 'numpy', default is 'r'
+        sw      : numpy.ndarray
+                  Shapiro-Wilk W statistic of every column of df if already computed, e.g. by
+                  UnivariateNormality, only used by the 'numpy' backend
 
         """
-        super().__init__(df)
+        super().__init__(df, backend=backend)
+        if sw is not None:
+            sw = np.asarray(sw, dtype=np.float64)
+            if sw.shape != (df.shape[1],):
+                raise ValueError("sw must hold one statistic per column, i.e. shape {}, "
+                                 "got {}".format((df.shape[1],), sw.shape))
+        self.sw = sw
 
     def run_royston_test(self):
         """
         Runs the Royston test for multivariate normality by delegating the task to the
-        MVN module in r
+        MVN module in r, in a private r environment
+
+        Returns
+        -------
+        Out     : tuple
+                  (royston test statistic, p-value)
 
         """
-        r('require("MVN", character.only = TRUE)')
-        r.assign("df", self.df)
-        r('res <- mvn(df, mvnTest = "royston")')
+        results = RSession.evaluate(
+            'res <- mvn(df, mvnTest = "royston"); '
+            'c(as.numeric(res$multivariateNormality["H"]), '
+            'as.numeric(res$multivariateNormality["p value"]))',
+            df=self.df)
         gc.collect()
+        return tuple(results)
+
+    def run_native_royston_test(self):
+        """
+        Runs the Royston test for multivariate normality in numpy. Shapiro-Wilk statistics are
+        taken from sw when given, columns with kurtosis above 3 use Shapiro-Francia as in the
+        MVN module in r.
+
+        Returns
+        -------
+        Out     : tuple
+                  (royston test statistic, p-value)
+
+        """
+        n, p = self.data.shape
+        if n <= 3 or n > 2000:
+            raise ValueError("Royston test requires 3 < n <= 2000, got n = {}".format(n))
+
+        leptokurtic = stats.kurtosis(self.data, axis=0, fisher=False) > 3
+        w = np.empty(p)
+        w[leptokurtic] = self.shapiro_francia(self.data[:, leptokurtic])
+        platykurtic = np.flatnonzero(~leptokurtic)
+        if self.sw is not None:
+            w[platykurtic] = self.sw[platykurtic]
+        else:
+            w[platykurtic] = [stats.shapiro(self.data[:, i])[0] for i in platykurtic]
+
+        # the MVN module always ends up with the 12 <= n <= 2000 transformation
+        x = np.log(n)
+        m = -1.5861 - 0.31082 * x - 0.083751 * x ** 2 + 0.0038915 * x ** 3
+        s = np.exp(-0.4803 - 0.082676 * x + 0.0030302 * x ** 2)
+        z = (np.log(1 - w) - m) / s
+
+        u = 0.715
+        v = 0.21364 + 0.015124 * x ** 2 - 0.0018034 * x ** 3
+        c = np.corrcoef(self.data, rowvar=False)
+        nc = c ** 5 * (1 - (u * (1 - c) ** u) / v)
+        mc = (np.sum(nc) - p) / (p ** 2 - p)
+        edf = p / (1 + (p - 1) * mc)
+
+        res = stats.norm.ppf(stats.norm.cdf(-z) / 2) ** 2
+        h = edf * np.sum(res) / p
+        p_h = stats.chi2.sf(h, edf)
+        return float(h), float(p_h)
 
     def print_results(self):
         """
@@ -48,7 +139,7 @@ class Royston(NormalityTest):
                   (royston test statistic, p-value)
 
         """
-        self.run_royston_test()
-        roy = r('as.numeric(res$multivariateNormality["H"])')
-        p_roy = r('as.numeric(res$multivariateNormality["p value"])')
-        return tuple(list(roy) + list(p_roy))
+        if self.backend == 'numpy':
+            return self.run_native_royston_test()
+
+        return self.run_royston_test()
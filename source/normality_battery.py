@@ -7,8 +7,11 @@ from source.util.descriptive_statistics import DescriptiveStatistics
 from source.util.multivariate_normality import MultivariateNormality
 from source.util.univariate_normality import UnivariateNormality
 from source.util.result_generator import ResultGenerator
+from source.util.result_exporter import ResultExporter
+from source.util.shared_buffer import SharedBuffer
+from source.util.result_cache import ResultCache
+from source.util.column_blocks import ColumnBlocks
 from source.util.assertor import Assertor
-from pyfiglet import Figlet
 from .version import __version__
 import pandas as pd
 import numpy as np
@@ -19,30 +22,243 @@ import os
 
 class NormalityBattery:
     """
-    Battery of univariate normality tests on row or column vectors of pandas.DataFrame
+    Battery of univariate normality tests on row or column vectors of pandas.DataFrame. The df
+    is validated and converted once into a single float buffer that all stages share. The
+    results of every stage are cached per (stage, dim, digits, test set) until df is replaced,
+    and the normality test results optionally also on disk.
 
     """
 
-    def __init__(self, df: pd.DataFrame):
+    def __init__(self, df: pd.DataFrame, cache_dir: str = None, cache_size: int = 2 ** 28,
+                 dtype: type = np.float64, r_workers: int = 0, seed: int = 90210):
         """
         Constructor / Initiate the class
 
         Parameters
         ----------
-        df      : pandas.DataFrame
-                  Dataframe for which one wants to test for normality
+        df          : pandas.DataFrame, ColumnBlocks, numpy.ndarray, str
+                      Dataframe for which one wants to test for normality, or out-of-core data,
+                      i.e. a ColumnBlocks, a numpy.memmap or the path of a .npy, HDF5 or
+                      Parquet file, whose vectors are read block by block
+        cache_dir   : str
+                      directory of the on-disk result cache shared by all batteries, results
+                      are only cached in memory if None, which is the default
+        cache_size  : int
+                      upper bound of the size of the on-disk cache in bytes, the least
+                      recently used results are evicted beyond it, default is 256 MiB
+        dtype       : type
+                      numpy.float64 or numpy.float32, dtype of the buffer the values of df are
+                      held in, float32 halves the memory at the cost of precision, default is
+                      numpy.float64
+        r_workers   : int
+                      number of long-lived r worker processes the multivariate tests of the
+                      'r' backend run on concurrently, default is 0, i.e. the tests run one
+                      after another in the embedded r session
+        seed        : int
+                      seed of the bootstrap of the native energy test, its results are
+                      reproducible and cached per seed, default is 90210
 
         """
-        Assertor.evaluate_pd_dataframe(df)
-        Assertor.evaluate_numeric_df(df)
+        if np.dtype(dtype) not in (np.float32, np.float64):
+            raise ValueError("dtype must be numpy.float32 or numpy.float64, got "
+                             "'{}'".format(np.dtype(dtype)))
+        Assertor.evaluate_data_type({r_workers: int, seed: int})
+        if r_workers < 0:
+            raise ValueError("r_workers must be a non-negative integer, got {}".format(r_workers))
+        self.dtype = np.dtype(dtype)
+        self.r_workers = r_workers
+        self.seed = seed
+        self.cache = ResultCache(cache_dir, cache_size) if cache_dir is not None else None
+        self._shared = None
+        self._blocks = None
+        self.df = df
+
+    @property
+    def df(self):
+        """
+        Dataframe for which one wants to test for normality
+
+        Returns
+        -------
+        Out     : pandas.DataFrame, ColumnBlocks
+                  df being tested, an in-memory df is backed by the shared buffer
+
+        """
+        return self._df
+
+    @df.setter
+    def df(self, df: pd.DataFrame):
+        """
+        Replaces the df being tested and invalidates all cached stage results. An in-memory df
+        is copied once into a C-contiguous buffer of dtype, which is not copied again by any
+        of the stages. A ColumnBlocks the battery opened from an array or path is closed when
+        it is replaced, one passed by the user is left open
+
+        Parameters
+        ----------
+        df      : pandas.DataFrame, ColumnBlocks, numpy.ndarray, str
+                  Dataframe for which one wants to test for normality, or out-of-core data
+
+        """
+        blocks = None
+        if isinstance(df, (np.ndarray, str)):
+            df = blocks = ColumnBlocks(df)
+        if not isinstance(df, ColumnBlocks):
+            Assertor.evaluate_pd_dataframe(df)
+            Assertor.evaluate_numeric_df(df)
 
         if np.prod(df.shape) < 400:
+            if blocks is not None:
+                blocks.close()
             raise ValueError(
                 "pd.DataFrame must have at least 400 observations, i.e. (20 x 20) in order to "
                 "conduct any meaningful normality tests, got {}".format(df.shape))
-        self.df = df
+        dtypes = None
+        if isinstance(df, pd.DataFrame):
+            # the dtypes of the input are kept for printing, e.g. the integer min and max
+            dtypes = df.dtypes
+            df = pd.DataFrame(np.asarray(df, dtype=self.dtype, order='C'), index=df.index,
+                              columns=df.columns, copy=False)
+        self.close()
+        if self._blocks is not None:
+            self._blocks.close()
+        self._blocks = blocks
+        self._df = df
+        self._dtypes = dtypes
+        self._fingerprint = None
+        self._sample = None
+        self._results = {}
+
+    def shared_buffer(self, executor: str):
+        """
+        Shared memory and process pool the stages of the process executor run on, the df is
+        copied into shared memory and the workers are started once per df
+
+        Parameters
+        ----------
+        executor: str
+                  'thread' or 'process'
+
+        Returns
+        -------
+        Out     : SharedBuffer
+                  shared buffer of the battery, None unless executor is 'process'
+
+        """
+        if executor != 'process':
+            return None
+        if self._shared is None:
+            self._shared = SharedBuffer()
+        return self._shared
+
+    def close(self):
+        """
+        Frees the shared memory and shuts down the worker processes of the process executor,
+        they are started again when needed
+
+        """
+        if self._shared is not None:
+            self._shared.close()
+            self._shared = None
+
+    def stage_results(self, key: tuple, run, labels: list = None):
+        """
+        Gets the results of a stage from the cache, the stage is only run on the first call
+        with a given key. NormalityResults, i.e. stages with labels, are also looked up in and
+        stored to the on-disk cache if there is one.
+
+        Parameters
+        ----------
+        key     : tuple
+                  (stage, dim, digits, test set) identifying the results
+        run     : callable
+                  runs the stage and returns its results
+        labels  : list
+                  labels of the vectors the NormalityResults of the stage belong to
+
+        Returns
+        -------
+        Out     : object
+                  results of the stage
+
+        """
+        if key in self._results:
+            return self._results[key]
+
+        if self.cache is None or labels is None:
+            results = run()
+        else:
+            if self._fingerprint is None:
+                self._fingerprint = ResultCache.fingerprint(self.df)
+            cache_key = self.cache.key(self._fingerprint, key + (__version__,))
+            results = self.cache.load(cache_key, labels, key[2])
+            if results is None:
+                results = run()
+                self.cache.store(cache_key, results)
+
+        self._results[key] = results
+        return results
+
+    def labels(self, dim: str):
+        """
+        Labels of the row or column vectors of df
+
+        Parameters
+        ----------
+        dim     : str
+                  'col' or 'row'
+
+        Returns
+        -------
+        Out     : pandas.Index
+                  column labels if dim is 'col', row labels otherwise
+
+        """
+        return self.df.columns if dim == 'col' else self.df.index
+
+    def multivariate_df(self):
+        """
+        Data the multivariate normality tests run on, i.e. df itself or, for out-of-core data,
+        its in-memory row sample, which is drawn once per df
+
+        Returns
+        -------
+        Out     : pandas.DataFrame
+                  df or sample of df
+
+        """
+        if not isinstance(self.df, ColumnBlocks):
+            return self.df
+        if self._sample is None:
+            self._sample = self.df.sample()
+        return self._sample
+
+    def multivariate_key(self, backend: str, digits: int):
+        """
+        Key of the multivariate normality results, which includes the seed of the energy
+        bootstrap and, for out-of-core data, the configuration of the row sample the tests run
+        on
+
+        Parameters
+        ----------
+        backend : str
+                  backend of the multivariate normality tests
+        digits  : int
+                  number of decimal places to round down
+
+        Returns
+        -------
+        Out     : tuple
+                  (stage, backend, digits, test set, seed[, sample configuration])
 
-    def descriptive_statistics(self, dim: str = 'col', digits: int = 5):
+        """
+        key = ('multivariate', backend, digits, MultivariateNormality.tests, ('seed', self.seed))
+        if isinstance(self.df, ColumnBlocks):
+            key += (('sample', self.df.sample_size, self.df.seed),)
+        return key
+
+    def descriptive_statistics(self, dim: str = 'col', digits: int = 5, n_jobs: int = 1,
+                               executor: str = 'thread'):
         """
         Gets descriptive statistics
 
@@ -53,6 +269,12 @@ class NormalityBattery:
                   or rows 'row', default is 'col'
         digits  : int
                   number of decimal places to round down
+        n_jobs  : int
+                  number of threads or processes the row/col vectors are split across, -1
+                  uses all cores
+        executor: str
+                  'thread' or 'process', processes read the df from shared memory, which
+                  pays off for very wide frames, default is 'thread'
 
         Returns
         -------
@@ -60,13 +282,20 @@ class NormalityBattery:
                   string containing descriptive statistics
 
         """
-        ds = DescriptiveStatistics(self.df, dim=dim, digits=digits)
-        return ds.generate_descriptive_statistics()
-
-    def univariate_normality(self, dim: str = 'col', digits: int = 5):
+        ds = DescriptiveStatistics(self.df, dim=dim, digits=digits, n_jobs=n_jobs,
+                                   executor=executor, shared=self.shared_buffer(executor),
+                                   dtypes=self._dtypes)
+        results = self.stage_results(
+            ('descriptive', dim, digits, DescriptiveStatistics.statistics),
+            ds.descriptive_statistics_results)
+        return ds.generate_descriptive_statistics(results)
+
+    def univariate_normality(self, dim: str = 'col', digits: int = 5, n_jobs: int = 1,
+                             executor: str = 'thread'):
         """
-        Checks to see if the values in the rows or columns of a dataframe are univariate normally
-        distributed using Jarque-Bera, D’Agostino / Pearson’s, Kolmogorov–Smirnov and Shapiro-Wilk.
+        Checks to see if the values in the rows or columns of a dataframe are univariate
+        normally distributed using Jarque-Bera, D’Agostino / Pearson’s, Kolmogorov–Smirnov and
+        Shapiro-Wilk.
 
         Parameters
         ----------
@@ -75,6 +304,12 @@ class NormalityBattery:
                   'row', default is 'col'
         digits  : int
                   number of decimal places to round down results
+        n_jobs  : int
+                  number of threads or processes the row/col vectors are split across, -1
+                  uses all cores
+        executor: str
+                  'thread' or 'process', processes read the df from shared memory, which
+                  pays off for very wide frames, default is 'thread'
 
         Returns
         -------
@@ -82,10 +317,13 @@ class NormalityBattery:
                   string containing test-statistic and p-value of row/col vectors
 
         """
-        un = UnivariateNormality(self.df, dim=dim, digits=digits)
-        return un.generate_univariate_normality_results()
+        un = UnivariateNormality(self.df, dim=dim, digits=digits, n_jobs=n_jobs,
+                                 executor=executor, shared=self.shared_buffer(executor))
+        results = self.stage_results(('univariate', dim, digits, UnivariateNormality.tests),
+                                     un.univariate_normality_results, self.labels(dim))
+        return un.generate_univariate_normality_results(results)
 
-    def multivariate_normality(self, digits: int = 5):
+    def multivariate_normality(self, digits: int = 5, backend: str = 'r', n_jobs: int = 1):
         """
         Check to see if values of numeric DataFrame follows a multivariate normal distribution
 
@@ -93,6 +331,12 @@ class NormalityBattery:
         ----------
         digits  : int
                   number of decimal places to round down results
+        backend : str
+                  'r' to run the tests through the MVN module in r or 'numpy' to run the
+                  native implementations, default is 'r'
+        n_jobs  : int
+                  number of threads running the bootstrap of the native energy test, -1 uses
+                  all cores, default is 1
 
         Returns
         -------
@@ -100,10 +344,15 @@ class NormalityBattery:
                   string containing test-statistic and p-value of row/col vectors
 
         """
-        mn = MultivariateNormality(self.df, digits=digits)
-        return mn.generate_multivariate_normality_results()
-
-    def result_summary(self, dim: str = 'col', digits: int = 5):
+        mn = MultivariateNormality(self.multivariate_df(), digits=digits, backend=backend,
+                                   r_workers=self.r_workers, n_jobs=n_jobs, seed=self.seed)
+        results = self.stage_results(
+            self.multivariate_key(backend, digits),
+            mn.multivariate_normality_results, ['df'])
+        return mn.generate_multivariate_normality_results(results)
+
+    def result_summary(self, dim: str = 'col', digits: int = 5, backend: str = 'r',
+                       n_jobs: int = 1, executor: str = 'thread'):
         """
         Summaries results of statistical tests
 
@@ -114,6 +363,16 @@ class NormalityBattery:
                       'col' or rows 'row', default is 'col'
         digits      : int
                       number of decimal places to round down
+        backend     : str
+                      backend of the multivariate normality tests, 'r' or 'numpy',
+                      default is 'r', the 'numpy' backend reuses the column Shapiro-Wilk
+                      statistics of the univariate tests in the Royston test
+        n_jobs      : int
+                      number of threads or processes the row/col vectors of the univariate
+                      tests are split across, and of threads running the bootstrap of the
+                      native energy test, -1 uses all cores
+        executor    : str
+                      'thread' or 'process', default is 'thread'
 
         Returns
         -------
@@ -121,14 +380,62 @@ class NormalityBattery:
                       (summary, un, mn-objects)
 
         """
+        (un_generator, un_results), (mn_generator, mn_results) = self.normality_results(
+            dim, digits, backend, n_jobs, executor)
+        summary = ResultGenerator(self.df, mn_results, un_results, dim,
+                                  digits).generate_result_summary()[0]
+        return (summary, mn_generator.generate_multivariate_normality_results(mn_results),
+                un_generator.generate_univariate_normality_results(un_results))
+
+    def normality_results(self, dim: str = 'col', digits: int = 5, backend: str = 'r',
+                          n_jobs: int = 1, executor: str = 'thread'):
+        """
+        Runs the univariate and multivariate normality tests, or gets their results from the
+        cache
+
+        Parameters
+        ----------
+        dim         : str
+                      indicate whether one wants to test for normality along the columns
+                      'col' or rows 'row', default is 'col'
+        digits      : int
+                      number of decimal places to round down
+        backend     : str
+                      backend of the multivariate normality tests, 'r' or 'numpy',
+                      default is 'r'
+        n_jobs      : int
+                      number of threads or processes the row/col vectors of the univariate
+                      tests are split across, and of threads running the bootstrap of the
+                      native energy test, -1 uses all cores
+        executor    : str
+                      'thread' or 'process', default is 'thread'
 
-        mn = self.multivariate_normality(digits)
-        un = self.univariate_normality(dim, digits)
-        result_summary = ResultGenerator(self.df, mn, un, dim, digits)
-        return result_summary.generate_result_summary()
+        Returns
+        -------
+        out         : tuple
+                      ((UnivariateNormality, NormalityResults), (MultivariateNormality,
+                      NormalityResults))
+
+        """
+        un_generator = UnivariateNormality(self.df, dim=dim, digits=digits, n_jobs=n_jobs,
+                                           executor=executor,
+                                           shared=self.shared_buffer(executor))
+        un_results = self.stage_results(('univariate', dim, digits, UnivariateNormality.tests),
+                                        un_generator.univariate_normality_results,
+                                        self.labels(dim))
+        # the statistics of the full columns only apply if the multivariate tests see all rows
+        sw = un_results['sw'][0] if dim == 'col' and isinstance(self.df, pd.DataFrame) else None
+        mn_generator = MultivariateNormality(self.multivariate_df(), digits=digits,
+                                             backend=backend, sw=sw, r_workers=self.r_workers,
+                                             n_jobs=n_jobs, seed=self.seed)
+        mn_results = self.stage_results(
+            self.multivariate_key(backend, digits),
+            mn_generator.multivariate_normality_results, ['df'])
+        return (un_generator, un_results), (mn_generator, mn_results)
 
     def normality_report(self, file_dir: str = "reports/txt", dim: str = 'col', digits: int = 5,
-                         ds: bool = False):
+                         ds: bool = False, backend: str = 'r', n_jobs: int = 1,
+                         executor: str = 'thread'):
         """
         Method that prints a report containing the results of the Normality tests
 
@@ -144,9 +451,19 @@ class NormalityBattery:
         ds          : bool
                       indicating if one wants additional table with descriptive
                       statistics of the data
+        backend     : str
+                      backend of the multivariate normality tests, 'r' or 'numpy',
+                      default is 'r'
+        n_jobs      : int
+                      number of threads or processes the row/col vectors are split across, and
+                      of threads running the bootstrap of the native energy test, -1 uses all
+                      cores
+        executor    : str
+                      'thread' or 'process', default is 'thread'
 
         """
-        Assertor.evaluate_data_type({file_dir: str, dim: str, digits: int, ds: bool})
+        Assertor.evaluate_data_type({file_dir: str, dim: str, digits: int, ds: bool,
+                                     backend: str, executor: str})
 
         try:
             if not os.path.exists(file_dir):
@@ -154,26 +471,93 @@ class NormalityBattery:
         except Exception as e:
             raise OSError("creation of dir " + file_dir + " failed with: " + str(e))
 
-        local_time = datetime.datetime.now().isoformat().replace(":", "-").replace(".", "-")
-        file = open(os.path.join(file_dir, "NormalityReport_" + local_time + ".txt"), "w")
-        summary, mn, un = self.result_summary(dim=dim, digits=digits)
+        (un_generator, un_results), (mn_generator, mn_results) = self.normality_results(
+            dim, digits, backend, n_jobs, executor)
+        summary = ResultGenerator(self.df, mn_results, un_results, dim,
+                                  digits).generate_result_summary()[0]
+        from pyfiglet import Figlet
         figlet = Figlet(font="slant")
         title = figlet.renderText("normb")
 
-        if ds:
-            file.write(title)
-            file.write('Version: ' + __version__ + '\n''\n')
-            file.write(summary + '\n')
-            file.write(mn + '\n')
-            file.write(un + '\n')
-            file.write(self.descriptive_statistics(dim, digits))
-        else:
+        # the univariate and descriptive tables are streamed row by row into a buffered file
+        local_time = datetime.datetime.now().isoformat().replace(":", "-").replace(".", "-")
+        with open(os.path.join(file_dir, "NormalityReport_" + local_time + ".txt"), "w",
+                  buffering=2 ** 20) as file:
             file.write(title)
             file.write('Version: ' + __version__ + '\n''\n')
             file.write(summary + '\n')
-            file.write(mn + '\n')
-            file.write(un + '\n')
-        file.close()
+            file.write(mn_generator.generate_multivariate_normality_results(mn_results) + '\n')
+            un_generator.write_univariate_normality_results(file, un_results)
+            file.write('\n')
+            if ds:
+                ds_generator = DescriptiveStatistics(self.df, dim=dim, digits=digits,
+                                                     n_jobs=n_jobs, executor=executor,
+                                                     shared=self.shared_buffer(executor),
+                                                     dtypes=self._dtypes)
+                ds_results = self.stage_results(
+                    ('descriptive', dim, digits, DescriptiveStatistics.statistics),
+                    ds_generator.descriptive_statistics_results)
+                ds_generator.write_descriptive_statistics(file, ds_results)
+
+    def export_results(self, file_dir: str = "reports/results", dim: str = 'col',
+                       digits: int = 5, backend: str = 'r', fmt: str = None, n_jobs: int = 1,
+                       executor: str = 'thread'):
+        """
+        Exports the univariate, multivariate, descriptive and summary results as columnar
+        tables, one file per table named after the table and the time of the export
+
+        Parameters
+        ----------
+        file_dir    : str
+                      directory to save the files
+        dim         : str
+                      indicate whether one wants to test for normality along the columns
+                      'col' or rows 'row', default is 'col'
+        digits      : int
+                      number of decimal places the significance levels are based on
+        backend     : str
+                      backend of the multivariate normality tests, 'r' or 'numpy',
+                      default is 'r'
+        fmt         : str
+                      'parquet', 'feather', 'csv' or 'json', default is the first of them
+                      whose engine is installed
+        n_jobs      : int
+                      number of threads or processes the row/col vectors are split across, and
+                      of threads running the bootstrap of the native energy test, -1 uses all
+                      cores
+        executor    : str
+                      'thread' or 'process', default is 'thread'
+
+        Returns
+        -------
+        Out         : dict
+                      {table name: path of the written file}
+
+        """
+        Assertor.evaluate_data_type({file_dir: str, dim: str, digits: int, backend: str,
+                                     executor: str})
+        exporter = ResultExporter(file_dir, fmt)
+
+        (un_generator, un_results), (mn_generator, mn_results) = self.normality_results(
+            dim, digits, backend, n_jobs, executor)
+        ds_generator = DescriptiveStatistics(self.df, dim=dim, digits=digits, n_jobs=n_jobs,
+                                             executor=executor,
+                                             shared=self.shared_buffer(executor),
+                                             dtypes=self._dtypes)
+        ds_results = self.stage_results(
+            ('descriptive', dim, digits, DescriptiveStatistics.statistics),
+            ds_generator.descriptive_statistics_results)
+        descriptive = pd.DataFrame(dict(zip(DescriptiveStatistics.statistics, ds_results)))
+        descriptive.insert(0, 'label', self.labels(dim))
+        summary = ResultGenerator(self.df, mn_results, un_results, dim, digits)
+
+        local_time = datetime.datetime.now().isoformat().replace(":", "-").replace(".", "-")
+        tables = {'univariate': un_results.to_frame(),
+                  'multivariate': mn_results.to_frame(),
+                  'descriptive': descriptive,
+                  'summary': summary.result_summary_frame()}
+        return {name: exporter.write(table, "{}_{}".format(name, local_time))
+                for name, table in tables.items()}
 
     def __getmethods__(self):
         """
@@ -188,4 +572,6 @@ class NormalityBattery:
         """
         return [method[0] for method in inspect.getmembers(self, predicate=inspect.ismethod) if
                 method[0] not in ['__init__', 'normality_report', 'result_summary',
-                                  '__getmethods__']]
+                                  'normality_results', 'stage_results', 'labels',
+                                  'export_results', 'multivariate_df', 'multivariate_key',
+                                  'shared_buffer', 'close', '__getmethods__']]
@@ -6,7 +6,6 @@ __email__ = 'samir.adrik@gmail.com'
 from source.exceptions.base_class_cannot_be_instantiated import BaseClassCannotBeInstantiated
 from source.exceptions.only_numeric_df_accepted import OnlyNumericDfAccepted
 import pandas as pd
-import numpy as np
 
 
 class Assertor:
@@ -52,7 +51,8 @@ class Assertor:
                   DataFrame to be evaluated if is numeric
 
         """
-        if df.shape[1] != df.select_dtypes(include=np.number).shape[1]:
+        if not all(pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+                   for dtype in df.dtypes):
             raise OnlyNumericDfAccepted("only numeric df accepted: got {}".format(type(df)))
 
     def __init__(self):
@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+
+__author__ = 'Samir Adrik'
+__email__ = 'samir.adrik@gmail.com'
+
+from source.exceptions.base_class_cannot_be_instantiated import BaseClassCannotBeInstantiated
+from scipy.special import ndtr, ndtri
+from functools import lru_cache
+import scipy.stats as stats
+import numpy as np
+
+
+class BatchedStatistics:
+    """
+    Univariate normality tests evaluated for all vectors of a 2-D array at once. Observations
+    are along axis 0, i.e. every column of the array is one vector.
+
+    """
+
+    @staticmethod
+    def moments(x: np.ndarray):
+        """
+        Computes the sample size, mean and the biased central moments of order 2, 3 and 4 of every
+        column in one pass over the centered data
+
+        Parameters
+        ----------
+        x       : numpy.ndarray
+                  n x k array of observations
+
+        Returns
+        -------
+        Out     : tuple
+                  (n, mean, m2, m3, m4) with the moments as arrays of length k
+
+        """
+        n = x.shape[0]
+        mean = x.mean(axis=0)
+        d = x - mean
+        d2 = d * d
+        m2 = d2.mean(axis=0)
+        m3 = np.einsum('ij,ij->j', d2, d) / n
+        m4 = np.einsum('ij,ij->j', d2, d2) / n
+        return n, mean, m2, m3, m4
+
+    @staticmethod
+    def skewness_kurtosis(m2: np.ndarray, m3: np.ndarray, m4: np.ndarray):
+        """
+        Biased sample skewness and (Pearson) kurtosis from the central moments
+
+        Parameters
+        ----------
+        m2      : numpy.ndarray
+                  second central moments
+        m3      : numpy.ndarray
+                  third central moments
+        m4      : numpy.ndarray
+                  fourth central moments
+
+        Returns
+        -------
+        Out     : tuple
+                  (skewness, kurtosis)
+
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return m3 / m2 ** 1.5, m4 / m2 ** 2
+
+    @staticmethod
+    def jarque_bera(n: int, skewness: np.ndarray, kurtosis: np.ndarray):
+        """
+        Jarque-Bera test, same as scipy.stats.jarque_bera for every vector
+
+        Parameters
+        ----------
+        n           : int
+                      number of observations per vector
+        skewness    : numpy.ndarray
+                      biased sample skewness per vector
+        kurtosis    : numpy.ndarray
+                      biased sample (Pearson) kurtosis per vector
+
+        Returns
+        -------
+        Out         : tuple
+                      (test statistics, p-values)
+
+        """
+        jb = n / 6 * (skewness ** 2 + (kurtosis - 3) ** 2 / 4)
+        return jb, stats.chi2.sf(jb, 2)
+
+    @staticmethod
+    def dagostino_k2(n: int, skewness: np.ndarray, kurtosis: np.ndarray):
+        """
+        D'Agostino and Pearson's K^2 test, same as scipy.stats.normaltest for every vector
+
+        Parameters
+        ----------
+        n           : int
+                      number of observations per vector, at least 8
+        skewness    : numpy.ndarray
+                      biased sample skewness per vector
+        kurtosis    : numpy.ndarray
+                      biased sample (Pearson) kurtosis per vector
+
+        Returns
+        -------
+        Out         : tuple
+                      (test statistics, p-values)
+
+        """
+        if n < 8:
+            raise ValueError("D'Agostino K^2 test requires at least 8 observations, "
+                             "got {}".format(n))
+
+        # skewness test
+        y = skewness * np.sqrt(((n + 1) * (n + 3)) / (6.0 * (n - 2)))
+        beta2 = (3.0 * (n ** 2 + 27 * n - 70) * (n + 1) * (n + 3)
+                 / ((n - 2.0) * (n + 5) * (n + 7) * (n + 9)))
+        w2 = -1 + np.sqrt(2 * (beta2 - 1))
+        delta = 1 / np.sqrt(0.5 * np.log(w2))
+        alpha = np.sqrt(2.0 / (w2 - 1))
+        y = np.where(y == 0, 1, y)
+        z_skew = delta * np.log(y / alpha + np.sqrt((y / alpha) ** 2 + 1))
+
+        # kurtosis test
+        e = 3.0 * (n - 1) / (n + 1)
+        var_b2 = 24.0 * n * (n - 2) * (n - 3) / ((n + 1) * (n + 1.0) * (n + 3) * (n + 5))
+        x = (kurtosis - e) / np.sqrt(var_b2)
+        sqrt_beta1 = (6.0 * (n * n - 5 * n + 2) / ((n + 7) * (n + 9))
+                      * np.sqrt((6.0 * (n + 3) * (n + 5)) / (n * (n - 2) * (n - 3))))
+        a = 6.0 + 8.0 / sqrt_beta1 * (2.0 / sqrt_beta1 + np.sqrt(1 + 4.0 / sqrt_beta1 ** 2))
+        term1 = 1 - 2 / (9.0 * a)
+        denom = 1 + x * np.sqrt(2 / (a - 4.0))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            term2 = np.sign(denom) * np.where(denom == 0.0, np.nan,
+                                              ((1 - 2.0 / a) / np.abs(denom)) ** (1 / 3.0))
+        z_kurt = (term1 - term2) / np.sqrt(2 / (9.0 * a))
+
+        k2 = z_skew ** 2 + z_kurt ** 2
+        return k2, stats.chi2.sf(k2, 2)
+
+    @staticmethod
+    def kolmogorov_smirnov(x: np.ndarray):
+        """
+        Two-sided one-sample Kolmogorov-Smirnov test against the standard normal distribution,
+        same as scipy.stats.kstest(vector, cdf='norm') for every vector. The array is sorted and
+        the normal cdf evaluated once for all columns. The exact distribution is evaluated once
+        per distinct statistic, since it dominates the cost when there are many short vectors,
+        e.g. in row mode.
+
+        Parameters
+        ----------
+        x       : numpy.ndarray
+                  n x k array of observations
+
+        Returns
+        -------
+        Out     : tuple
+                  (test statistics, p-values)
+
+        """
+        n = x.shape[0]
+        cdf = ndtr(np.sort(x, axis=0))
+        steps = np.arange(n + 1.0)[:, np.newaxis] / n
+        d_plus = np.max(steps[1:] - cdf, axis=0)
+        d_minus = np.max(cdf - steps[:-1], axis=0)
+        d = np.maximum(d_plus, d_minus)
+        distinct, inverse = np.unique(d, return_inverse=True)
+        p = stats.kstwo.sf(distinct, n)[inverse.reshape(d.shape)]
+        return d, np.clip(p, 0, 1)
+
+    @staticmethod
+    def polynomial(coefficients: list, x: float):
+        """
+        Evaluates the polynomial coefficients[0] + coefficients[1] * x + ... at x
+
+        Parameters
+        ----------
+        coefficients    : list of float
+                          coefficients in increasing order
+        x               : float
+                          point of evaluation
+
+        Returns
+        -------
+        Out             : float
+                          value of the polynomial
+
+        """
+        value = 0.0
+        for coefficient in reversed(coefficients):
+            value = value * x + coefficient
+        return value
+
+    @staticmethod
+    @lru_cache(maxsize=32)
+    def shapiro_wilk_coefficients(n: int):
+        """
+        Royston's (1995) approximation of the Shapiro-Wilk coefficients for samples of size n,
+        cached per n since all vectors of a df have the same length
+
+        Parameters
+        ----------
+        n       : int
+                  sample size, at least 3
+
+        Returns
+        -------
+        Out     : numpy.ndarray
+                  read-only antisymmetric coefficient vector of length n, matching the sorted
+                  sample in ascending order
+
+        """
+        poly = BatchedStatistics.polynomial
+        half = n // 2
+        if n == 3:
+            a = np.array([np.sqrt(0.5)])
+        else:
+            m = ndtri((np.arange(1, half + 1) - .375) / (n + .25))
+            summ2 = 2 * np.sum(m ** 2)
+            ssumm2 = np.sqrt(summ2)
+            rsn = 1 / np.sqrt(n)
+            a1 = poly([0., .221157, -.147981, -2.07119, 4.434685, -2.706056], rsn) - m[0] / ssumm2
+            if n > 5:
+                a2 = -m[1] / ssumm2 + poly([0., .042981, -.293762, -1.752461, 5.682633,
+                                            -3.582633], rsn)
+                fac = np.sqrt((summ2 - 2 * m[0] ** 2 - 2 * m[1] ** 2)
+                              / (1 - 2 * a1 ** 2 - 2 * a2 ** 2))
+                a = -m / fac
+                a[1] = a2
+            else:
+                fac = np.sqrt((summ2 - 2 * m[0] ** 2) / (1 - 2 * a1 ** 2))
+                a = -m / fac
+            a[0] = a1
+
+        coefficients = np.zeros(n)
+        coefficients[:half] = -a
+        coefficients[n - half:] = a[::-1]
+        coefficients.flags.writeable = False
+        return coefficients
+
+    @staticmethod
+    def shapiro_wilk(x: np.ndarray):
+        """
+        Shapiro-Wilk test, same algorithm as scipy.stats.shapiro for every vector. W is computed
+        for all columns with a single matrix-vector product of the cached coefficients and the
+        column-sorted array, and the p-values with Royston's normal approximation.
+
+        Parameters
+        ----------
+        x       : numpy.ndarray
+                  n x k array of observations
+
+        Returns
+        -------
+        Out     : tuple
+                  (test statistics, p-values)
+
+        """
+        n = x.shape[0]
+        if n < 3:
+            raise ValueError("Shapiro-Wilk test requires at least 3 observations, "
+                             "got {}".format(n))
+
+        a = BatchedStatistics.shapiro_wilk_coefficients(n)
+        xs = np.sort(x, axis=0)
+        xs -= xs.mean(axis=0)
+        ssa = np.dot(a, a)
+        ssx = np.einsum('ij,ij->j', xs, xs)
+        sax = np.dot(a, xs)
+        ssassx = np.sqrt(ssa * ssx)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            w1 = (ssassx - sax) * (ssassx + sax) / (ssa * ssx)
+        w = 1 - w1
+
+        poly = BatchedStatistics.polynomial
+        if n == 3:
+            return w, np.maximum(6 / np.pi * (np.arcsin(np.sqrt(w)) - np.pi / 3), 0)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            y = np.log(w1)
+            if n <= 11:
+                gamma = poly([-2.273, .459], n)
+                m = poly([.544, -.39978, .025054, -6.714e-4], n)
+                s = np.exp(poly([1.3822, -.77857, .062767, -.0020322], n))
+                p = np.where(y >= gamma, 1e-99, stats.norm.sf((-np.log(gamma - y) - m) / s))
+            else:
+                ln = np.log(n)
+                m = poly([-1.5861, -.31082, -.083751, .0038915], ln)
+                s = np.exp(poly([-.4803, -.082676, .0030302], ln))
+                p = stats.norm.sf((y - m) / s)
+        return w, p
+
+    def __init__(self):
+        """
+        Constructor / Instantiating the class
+
+        """
+        if type(self) == BatchedStatistics:
+            raise BaseClassCannotBeInstantiated(
+                "base class '{}' cannot be instantiated".format(self.__class__.__name__))
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+
+__author__ = 'Samir Adrik'
+__email__ = 'samir.adrik@gmail.com'
+
+from source.exceptions.only_numeric_df_accepted import OnlyNumericDfAccepted
+import pandas as pd
+import numpy as np
+import hashlib
+import weakref
+import os
+
+
+class ColumnBlocks:
+    """
+    Out-of-core, numeric 2-D data read one block of vectors at a time. The data can be a
+    numpy.ndarray or numpy.memmap, or the path of a .npy file (memory-mapped), an HDF5 file
+    (needs h5py) or a Parquet file (needs pyarrow). Exposes shape, columns and index like a
+    pandas.DataFrame, so that the univariate and descriptive generators can iterate over it
+    with bounded memory. An HDF5 file stays open until close() is called, the with block is
+    left, or the ColumnBlocks is garbage collected.
+
+    """
+
+    def __init__(self, source, block_size: int = 1024, sample_size: int = 10000,
+                 seed: int = 90210, key: str = None):
+        """
+        Constructor / Initiate the class
+
+        Parameters
+        ----------
+        source      : numpy.ndarray, str
+                      2-D array, or path of a .npy, .h5 / .hdf5 or .parquet file
+        block_size  : int
+                      number of vectors read per block
+        sample_size : int
+                      number of rows of the in-memory sample the multivariate tests run on
+        seed        : int
+                      seed of the row sample
+        key         : str
+                      name of the dataset in an HDF5 file, default is the first dataset
+
+        """
+        if block_size < 1 or sample_size < 1:
+            raise ValueError("block_size and sample_size must be positive integers, got {} and "
+                             "{}".format(block_size, sample_size))
+
+        self.parquet = None
+        self.file = None
+        if isinstance(source, np.ndarray):
+            self.array = source
+        elif isinstance(source, str):
+            extension = os.path.splitext(source)[1].lower()
+            if extension == '.npy':
+                self.array = np.load(source, mmap_mode='r')
+            elif extension in ('.h5', '.hdf5'):
+                import h5py
+                self.file = h5py.File(source, 'r')
+                weakref.finalize(self, self.file.close)
+                self.array = self.file[key if key is not None else next(
+                    name for name in self.file if isinstance(self.file[name], h5py.Dataset))]
+            elif extension == '.parquet':
+                import pyarrow.parquet as pq
+                self.parquet = pq.ParquetFile(source)
+                self.array = None
+            else:
+                raise TypeError("expected the path of a .npy, .h5, .hdf5 or .parquet file, got "
+                                "'{}'".format(source))
+        else:
+            raise TypeError("source must be of type 'numpy.ndarray' or 'str', got "
+                            "'{}'".format(type(source).__name__))
+
+        if self.parquet is not None:
+            schema = self.parquet.schema_arrow
+            names = schema.names
+            numeric = all(np.issubdtype(np.dtype(field.type.to_pandas_dtype()), np.number)
+                          for field in schema)
+            shape = (self.parquet.metadata.num_rows, len(names))
+            self.columns = pd.Index(names)
+        else:
+            numeric = np.issubdtype(self.array.dtype, np.number)
+            shape = tuple(self.array.shape)
+            self.columns = pd.RangeIndex(shape[1]) if len(shape) == 2 else None
+
+        if len(shape) != 2:
+            raise ValueError("source must be 2-dimensional, got shape {}".format(shape))
+        if not numeric:
+            raise OnlyNumericDfAccepted("only numeric data accepted")
+
+        self.shape = shape
+        self.index = pd.RangeIndex(shape[0])
+        self.block_size = block_size
+        self.sample_size = sample_size
+        self.seed = seed
+
+    def __enter__(self):
+        """
+        Enters the with block, the data is closed when the block is left
+
+        Returns
+        -------
+        Out     : ColumnBlocks
+                  this ColumnBlocks
+
+        """
+        return self
+
+    def __exit__(self, *exc_info):
+        """
+        Closes the data when the with block is left
+
+        """
+        self.close()
+
+    def close(self):
+        """
+        Closes the HDF5 file the data is read from, does nothing for other sources
+
+        """
+        if self.file is not None:
+            self.file.close()
+
+    def read(self, rows: slice, cols: slice):
+        """
+        Reads a rectangular block of the data
+
+        Parameters
+        ----------
+        rows    : slice
+                  rows to read
+        cols    : slice
+                  columns to read
+
+        Returns
+        -------
+        Out     : numpy.ndarray
+                  float64 array of the block
+
+        """
+        if self.parquet is None:
+            return np.asarray(self.array[rows, cols], dtype=np.float64)
+
+        names = list(self.columns[cols])
+        table = self.parquet.read(columns=names)
+        start, stop, _ = rows.indices(self.shape[0])
+        table = table.slice(start, stop - start)
+        return np.column_stack([table.column(name).to_numpy().astype(np.float64)
+                                for name in names]).reshape(stop - start, len(names))
+
+    def row_blocks(self):
+        """
+        Iterates over the rows in blocks of block_size rows, in the order they are stored
+
+        Returns
+        -------
+        Out     : generator of numpy.ndarray
+                  m x p float64 arrays of consecutive rows
+
+        """
+        if self.parquet is not None:
+            for batch in self.parquet.iter_batches(batch_size=self.block_size):
+                yield np.column_stack([column.to_numpy(zero_copy_only=False).astype(np.float64)
+                                       for column in batch.columns]).reshape(
+                    batch.num_rows, self.shape[1])
+        else:
+            n = self.shape[0]
+            for start in range(0, n, self.block_size):
+                yield self.read(slice(start, min(start + self.block_size, n)), slice(None))
+
+    def blocks(self, dim: str = 'col'):
+        """
+        Iterates over the row or column vectors in blocks of block_size vectors
+
+        Parameters
+        ----------
+        dim     : str
+                  'col' or 'row'
+
+        Returns
+        -------
+        Out     : generator of numpy.ndarray
+                  n x k float64 arrays, every column is one vector
+
+        """
+        if dim == 'col':
+            p = self.shape[1]
+            for start in range(0, p, self.block_size):
+                yield self.read(slice(None), slice(start, min(start + self.block_size, p)))
+        else:
+            for block in self.row_blocks():
+                yield block.T
+
+    def sample(self):
+        """
+        Draws an in-memory sample of at most sample_size rows, e.g. for the multivariate tests
+
+        Returns
+        -------
+        Out     : pandas.DataFrame
+                  sampled rows in their original order, all rows if there are fewer than
+                  sample_size
+
+        """
+        n = self.shape[0]
+        if n <= self.sample_size:
+            rows = np.arange(n)
+        else:
+            rows = np.sort(np.random.RandomState(self.seed).choice(n, self.sample_size,
+                                                                    replace=False))
+
+        if self.parquet is None:
+            values = np.asarray(self.array[rows], dtype=np.float64)
+        else:
+            parts, offset = [], 0
+            for block in self.row_blocks():
+                selected = rows[(rows >= offset) & (rows < offset + len(block))] - offset
+                parts.append(block[selected])
+                offset += len(block)
+            values = np.concatenate(parts) if parts else np.empty((0, self.shape[1]))
+        return pd.DataFrame(values, index=rows, columns=self.columns)
+
+    def fingerprint(self):
+        """
+        Hashes the data block by block, see ResultCache.fingerprint()
+
+        Returns
+        -------
+        Out     : str
+                  hex digest identifying the data
+
+        """
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update("{}{}".format(self.shape, np.dtype(np.float64).str).encode())
+        for block in self.row_blocks():
+            digest.update(memoryview(np.ascontiguousarray(block)).cast('B'))
+        return digest.hexdigest()
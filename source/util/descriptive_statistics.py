@@ -3,10 +3,12 @@
 __author__ = 'Samir Adrik'
 __email__ = 'samir.adrik@gmail.com'
 
+from source.util.batched_statistics import BatchedStatistics
+from source.util.table_writer import TableWriter
+from source.util.column_blocks import ColumnBlocks
+from source.util.shared_buffer import SharedBuffer
 from source.util.generator import Generator
 from source.util.assertor import Assertor
-from prettytable import PrettyTable
-import scipy.stats as stats
 import numpy as np
 import pandas as pd
 
@@ -17,42 +19,141 @@ class DescriptiveStatistics(Generator):
 
     """
 
-    def __init__(self, df: pd.DataFrame, dim: str = 'col', digits: int = 5):
+    statistics = ('mean', 'median', 'variance', 'stdev', 'kurtosis', 'skewness', 'min', 'max')
+
+    @staticmethod
+    def descriptive_statistics(vectors: np.ndarray):
+        """
+        Computes the descriptive statistics of every column of vectors in two axis-wise passes,
+        the central moments come from BatchedStatistics.moments() and the median, min and max
+        from a single partition of each column around the order statistics needed
+
+        Parameters
+        ----------
+        vectors : numpy.ndarray
+                  n x k array, every column is one vector
+
+        Returns
+        -------
+        Out     : tuple of numpy.ndarray
+                  (mean, median, variance, stdev, kurtosis, skewness, min, max) with one entry
+                  per vector
+
+        """
+        n, _, m2, m3, m4 = BatchedStatistics.moments(vectors)
+        skewness, kurtosis = BatchedStatistics.skewness_kurtosis(m2, m3, m4)
+
+        # the mean and variance are summed along each vector on its own, in the order np.mean
+        # and np.var sum a single vector, so that the rounded values do not change
+        columns = np.asfortranarray(vectors)
+        mean = columns.sum(axis=0) / n
+        variance = np.square(mean - columns).sum(axis=0) / n
+
+        half = (n - 1) // 2
+        kth = sorted({0, half, n - 1 - half, n - 1})
+        order = np.partition(vectors, kth, axis=0)
+        median = (order[half] + order[n - 1 - half]) / 2
+        minimum, maximum = order[0], order[n - 1]
+
+        # np.partition sorts nan last, mirror np.median / np.min / np.max instead
+        missing = np.isnan(mean)
+        if missing.any():
+            median[missing] = minimum[missing] = maximum[missing] = np.nan
+
+        return (mean, median, variance, np.sqrt(variance), kurtosis - 3, skewness, minimum,
+                maximum)
+
+    def __init__(self, df: pd.DataFrame, dim: str = 'col', digits: int = 5, n_jobs: int = 1,
+                 executor: str = 'thread', shared: SharedBuffer = None,
+                 dtypes: pd.Series = None):
         """
         Constructor / Initiate the class
 
         Parameters
         ----------
-        df      : pandas.DataFrame
-                  Dataframe for which one wants to generate / test
-        dim     : str
-                  indicate whether one wants to test for normality along the columns 'col' or rows
-                  'row', default is 'col'
-        digits  : int
-                  number of decimal places to round down
+        df          : pandas.DataFrame, ColumnBlocks
+                      Dataframe for which one wants to generate / test, or out-of-core data
+                      read one block of vectors at a time
+        dim         : str
+                      indicate whether one wants to test for normality along the columns 'col'
+                      or rows 'row', default is 'col'
+        digits      : int
+                      number of decimal places to round down
+        n_jobs      : int
+                      number of threads or processes the vectors are split across, -1 uses
+                      all cores, default is 1
+        executor    : str
+                      'thread' or 'process', the process pool reads the vectors from shared
+                      memory, default is 'thread'
+        shared      : SharedBuffer
+                      shared memory and process pool kept across stages, e.g. by
+                      NormalityBattery, default is None, i.e. created per call
+        dtypes      : pandas.Series
+                      dtypes of the columns as given by the user, the min and max of integer
+                      vectors are printed as integers, default is the dtypes of df
 
         """
         super().__init__(dim=dim, digits=digits)
-        Assertor.evaluate_pd_dataframe(df)
-        Assertor.evaluate_numeric_df(df)
+        if not isinstance(df, ColumnBlocks):
+            Assertor.evaluate_pd_dataframe(df)
+            Assertor.evaluate_numeric_df(df)
         Assertor.evaluate_data_type({dim: str, digits: int})
 
         self.df = df
         self.dim = dim
         self.digits = digits
+        self.n_jobs = n_jobs
+        self.executor = executor
+        self.shared = shared
+        self.dtypes = dtypes if dtypes is not None else getattr(df, 'dtypes', None)
 
-    def generate_descriptive_statistics(self):
+    def descriptive_statistics_results(self):
         """
-        Method that generates descriptive statistics from a pandas.DataFrame's column or row
-        vectors.
+        Computes the descriptive statistics of all of a pandas.DataFrame's column or row vectors
 
         Returns
         -------
-        Out     : str
-                  String of descriptive statistics
+        Out     : tuple of numpy.ndarray
+                  (mean, median, variance, stdev, kurtosis, skewness, min, max) with one entry
+                  per vector
+
+        """
+        return self.map_vectors(self.descriptive_statistics, self.df, self.dim, self.n_jobs,
+                                self.executor, self.shared)
+
+    def integer_vectors(self):
+        """
+        Finds the vectors holding integers, i.e. the integer columns, or all rows if every
+        column holds integers
+
+        Returns
+        -------
+        Out     : numpy.ndarray
+                  boolean mask with one entry per vector
+
+        """
+        labels = self.df.columns if self.dim == "col" else self.df.index
+        if self.dtypes is None:
+            return np.zeros(len(labels), dtype=bool)
+        integer = np.array([pd.api.types.is_integer_dtype(dtype) for dtype in self.dtypes],
+                           dtype=bool)
+        return integer if self.dim == "col" else np.full(len(labels), integer.all())
+
+    def descriptive_statistics_table(self, results: tuple):
+        """
+        Formats the descriptive statistics as the columns of a table
+
+        Parameters
+        ----------
+        results : tuple of numpy.ndarray
+                  results of descriptive_statistics_results()
+
+        Returns
+        -------
+        Out     : tuple
+                  (TableWriter, list of formatted columns)
 
         """
-        desc_table = PrettyTable(vrules=2, hrules=3)
         rnd, d = round, self.digits
         dim_name = 'col' if self.dim == 'col' else 'row'
 
@@ -67,16 +168,55 @@ class DescriptiveStatistics(Generator):
                              '       min',
                              '         max']
 
-        desc_table.field_names = decs_header_names
+        labels = self.df.columns if self.dim == "col" else self.df.index
+        columns = [[''] * len(labels), [str(rnd(i + 1, d)) for i in labels]]
+        columns += [self.format_column(result, d) for result in results]
+
+        # the min and max of integer vectors are printed in the dtype of the input
+        for column, result in zip(columns[-2:], results[-2:]):
+            for i in np.flatnonzero(self.integer_vectors()):
+                column[i] = str(int(result[i]))
+        return TableWriter(decs_header_names, frame=False), columns
+
+    def generate_descriptive_statistics(self, results: tuple = None):
+        """
+        Method that generates descriptive statistics from a pandas.DataFrame's column or row
+        vectors.
+
+        Parameters
+        ----------
+        results : tuple of numpy.ndarray
+                  results of descriptive_statistics_results() to be rendered, computed if not
+                  given
+
+        Returns
+        -------
+        Out     : str
+                  String of descriptive statistics
+
+        """
+        if results is None:
+            results = self.descriptive_statistics_results()
+
+        table, columns = self.descriptive_statistics_table(results)
+        return table.render(columns)
 
-        vectors = self.df.iteritems() if self.dim == "col" else self.df.iterrows()
+    def write_descriptive_statistics(self, file, results: tuple = None):
+        """
+        Writes the descriptive statistics row by row to file, same layout as
+        generate_descriptive_statistics()
+
+        Parameters
+        ----------
+        file    : file object
+                  text file the descriptive statistics are written to
+        results : tuple of numpy.ndarray
+                  results of descriptive_statistics_results() to be written, computed if not
+                  given
+
+        """
+        if results is None:
+            results = self.descriptive_statistics_results()
 
-        for i, vector in vectors:
-            desc_row = [''] + [rnd(param, d) for param in
-                               [i + 1, np.mean(vector), np.median(vector),
-                                np.var(vector), np.std(vector),
-                                stats.kurtosis(vector), stats.skew(vector),
-                                min(vector), max(vector)]]
-            desc_table.add_row(desc_row)
-        desc_table.align = "r"
-        return str(desc_table)
+        table, columns = self.descriptive_statistics_table(results)
+        table.write(file, columns)
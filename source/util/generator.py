@@ -4,9 +4,14 @@ __author__ = 'Samir Adrik'
 __email__ = 'samir.adrik@gmail.com'
 
 from source.exceptions.base_class_cannot_be_instantiated import BaseClassCannotBeInstantiated
+from source.util.column_blocks import ColumnBlocks
 from source.util.assertor import Assertor
+from source.util.shared_buffer import SharedBuffer
+from concurrent.futures import ThreadPoolExecutor
 from bisect import bisect_left
+import numpy as np
 import inspect
+import os
 
 
 class Generator:
@@ -67,6 +72,136 @@ class Generator:
                 temp.append(char)
         return count
 
+    @staticmethod
+    def format_column(values: np.ndarray, digits: int):
+        """
+        Rounds values and formats them the way str(round(value, digits)) does, for all values
+        of a table column at once
+
+        Parameters
+        ----------
+        values  : numpy.ndarray
+                  values of the column
+        digits  : int
+                  number of decimal places to round down
+
+        Returns
+        -------
+        Out     : list of str
+                  formatted cells
+
+        """
+        return [str(value) for value in np.round(values, digits).tolist()]
+
+    @staticmethod
+    def map_chunks(function, vectors: np.ndarray, n_jobs: int = 1, executor: str = 'thread',
+                   shared: SharedBuffer = None, source=None):
+        """
+        Applies function to chunks of columns of vectors on a thread or process pool and merges
+        the results back in column order. The process pool runs on a SharedBuffer, from which
+        the workers read their chunks without copying.
+
+        Parameters
+        ----------
+        function    : callable
+                      function taking an n x k array and returning a tuple of arrays of
+                      length k, must be picklable for the process pool
+        vectors     : numpy.ndarray
+                      n x k float32 or float64 array, every column is one vector
+        n_jobs      : int
+                      number of threads or processes, -1 uses all cores
+        executor    : str
+                      'thread' or 'process', default is 'thread'
+        shared      : SharedBuffer
+                      shared memory and process pool of the process executor, which are
+                      kept across calls, default is None, i.e. created for this call only
+        source      : object
+                      object vectors are read from, vectors are not copied into shared again
+                      if they were last loaded from the same source, see SharedBuffer.load()
+
+        Returns
+        -------
+        Out         : tuple of numpy.ndarray
+                      results of function for all k columns
+
+        """
+        Assertor.evaluate_data_type({n_jobs: int, executor: str})
+        if executor not in ('thread', 'process'):
+            raise ValueError("executor must be 'thread' or 'process', got '{}'".format(executor))
+        n_jobs = os.cpu_count() if n_jobs == -1 else n_jobs
+        if n_jobs < 1:
+            raise ValueError("n_jobs must be -1 or a positive integer, got {}".format(n_jobs))
+
+        n_jobs = min(n_jobs, vectors.shape[1])
+        if n_jobs <= 1:
+            return function(vectors)
+
+        bounds = np.linspace(0, vectors.shape[1], n_jobs + 1).astype(int)
+        if executor == 'thread':
+            chunks = [vectors[:, start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+            with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+                results = list(pool.map(function, chunks))
+        else:
+            buffer = SharedBuffer() if shared is None else shared
+            try:
+                buffer.load(vectors, source)
+                results = buffer.map(function, vectors, bounds)
+            finally:
+                if shared is None:
+                    buffer.close()
+        return tuple(np.concatenate(parts) for parts in zip(*results))
+
+    @staticmethod
+    def map_vectors(function, df, dim: str = 'col', n_jobs: int = 1, executor: str = 'thread',
+                    shared: SharedBuffer = None):
+        """
+        Applies function to all row or column vectors of df with map_chunks(). df is converted
+        to float64 once, unless it already holds float32 or float64 values, and row vectors are
+        the columns of its transposed view, so that both dimensions run through the same
+        batched kernels without a further copy. A ColumnBlocks source is processed one block
+        of vectors at a time, so that only a single block has to be held in memory, and all
+        blocks run on the same process pool.
+
+        Parameters
+        ----------
+        function    : callable
+                      function taking an n x k array and returning a tuple of arrays of
+                      length k
+        df          : pandas.DataFrame, ColumnBlocks
+                      data whose vectors are processed
+        dim         : str
+                      'col' or 'row'
+        n_jobs      : int
+                      number of threads or processes, -1 uses all cores
+        executor    : str
+                      'thread' or 'process', default is 'thread'
+        shared      : SharedBuffer
+                      shared memory and process pool of the process executor, which are
+                      kept across calls, default is None, i.e. created for this call only
+
+        Returns
+        -------
+        Out         : tuple of numpy.ndarray
+                      results of function for all vectors
+
+        """
+        if isinstance(df, ColumnBlocks):
+            buffer = SharedBuffer() if shared is None and executor == 'process' else shared
+            try:
+                results = [Generator.map_chunks(function, block, n_jobs, executor, buffer)
+                           for block in df.blocks(dim)]
+            finally:
+                if buffer is not shared:
+                    buffer.close()
+            return tuple(np.concatenate(parts) for parts in zip(*results))
+
+        vectors = np.asarray(df)
+        if vectors.dtype not in (np.float32, np.float64):
+            vectors = vectors.astype(np.float64)
+        if dim != "col":
+            vectors = vectors.T
+        return Generator.map_chunks(function, vectors, n_jobs, executor, shared, df)
+
     def __init__(self, dim: str = 'col', digits: int = 5, seed: int = 90210,
                  size: (tuple, int) = (30, 30)):
         """
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+
+__author__ = 'Samir Adrik'
+__email__ = 'samir.adrik@gmail.com'
+
+from source.util.batched_statistics import BatchedStatistics
+import pandas as pd
+import numpy as np
+
+
+class MomentAccumulator:
+    """
+    Per-column count, mean, central moments up to the 4th, min and max of data arriving in row
+    batches. Batches and other accumulators are merged with the pairwise updates of Pébay
+    (2008), so descriptive statistics, Jarque-Bera and D'Agostino K^2 are available at any point
+    without revisiting earlier rows.
+
+    """
+
+    def __init__(self):
+        """
+        Constructor / Initiate the class
+
+        """
+        self.n = 0
+        self.columns = None
+        self.mean = None
+        self.sums = None
+        self.minimum = None
+        self.maximum = None
+
+    def update(self, batch):
+        """
+        Adds a batch of rows
+
+        Parameters
+        ----------
+        batch   : pandas.DataFrame, numpy.ndarray
+                  m x p batch of observations, every column is one vector
+
+        Returns
+        -------
+        Out     : MomentAccumulator
+                  self, with the batch accumulated
+
+        """
+        columns = batch.columns if isinstance(batch, pd.DataFrame) else None
+        x = np.asarray(batch, dtype=np.float64)
+        if x.ndim != 2:
+            raise ValueError("batch must be 2-dimensional, got shape {}".format(x.shape))
+        if not len(x):
+            return self
+
+        other = MomentAccumulator()
+        other.n, other.mean, m2, m3, m4 = BatchedStatistics.moments(x)
+        other.sums = np.array([m2, m3, m4]) * other.n
+        other.minimum, other.maximum = x.min(axis=0), x.max(axis=0)
+        other.columns = columns
+        return self.merge(other)
+
+    def merge(self, other):
+        """
+        Merges the moments of another accumulator into this one, the result is the same as if
+        all batches of other had been added to this accumulator
+
+        Parameters
+        ----------
+        other   : MomentAccumulator
+                  accumulator over the same columns, column labels are only compared if
+                  both accumulators have them
+
+        Returns
+        -------
+        Out     : MomentAccumulator
+                  self, with other merged in
+
+        """
+        if not other.n:
+            return self
+        if (self.n and self.columns is not None and other.columns is not None
+                and not self.columns.equals(other.columns)):
+            raise ValueError("cannot merge moments of columns {} into moments of columns "
+                             "{}".format(list(other.columns), list(self.columns)))
+        if not self.n:
+            self.n, self.columns = other.n, other.columns
+            self.mean, self.sums = other.mean.copy(), other.sums.copy()
+            self.minimum, self.maximum = other.minimum.copy(), other.maximum.copy()
+            return self
+        if other.mean.shape != self.mean.shape:
+            raise ValueError("cannot merge moments of {} columns into moments of {} "
+                             "columns".format(other.mean.shape[0], self.mean.shape[0]))
+
+        na, nb = self.n, other.n
+        n = na + nb
+        delta = other.mean - self.mean
+        (m2a, m3a, m4a), (m2b, m3b, m4b) = self.sums, other.sums
+
+        m2 = m2a + m2b + delta ** 2 * na * nb / n
+        m3 = (m3a + m3b + delta ** 3 * na * nb * (na - nb) / n ** 2
+              + 3 * delta * (na * m2b - nb * m2a) / n)
+        m4 = (m4a + m4b + delta ** 4 * na * nb * (na ** 2 - na * nb + nb ** 2) / n ** 3
+              + 6 * delta ** 2 * (na ** 2 * m2b + nb ** 2 * m2a) / n ** 2
+              + 4 * delta * (na * m3b - nb * m3a) / n)
+
+        self.n = n
+        self.columns = self.columns if self.columns is not None else other.columns
+        self.mean = self.mean + delta * nb / n
+        self.sums = np.array([m2, m3, m4])
+        self.minimum = np.minimum(self.minimum, other.minimum)
+        self.maximum = np.maximum(self.maximum, other.maximum)
+        return self
+
+    def moments(self):
+        """
+        Sample size, mean and the biased central moments of every column, same as
+        BatchedStatistics.moments() on all accumulated rows
+
+        Returns
+        -------
+        Out     : tuple
+                  (n, mean, m2, m3, m4) with the moments as arrays of length p
+
+        """
+        if not self.n:
+            raise ValueError("no observations have been accumulated")
+        m2, m3, m4 = self.sums / self.n
+        return self.n, self.mean, m2, m3, m4
+
+    def descriptive_statistics(self):
+        """
+        Descriptive statistics of every column, the median cannot be accumulated and is left
+        out
+
+        Returns
+        -------
+        Out     : tuple of numpy.ndarray
+                  (mean, variance, stdev, kurtosis, skewness, min, max) with one entry per
+                  column
+
+        """
+        _, mean, m2, m3, m4 = self.moments()
+        skewness, kurtosis = BatchedStatistics.skewness_kurtosis(m2, m3, m4)
+        return mean, m2, np.sqrt(m2), kurtosis - 3, skewness, self.minimum, self.maximum
+
+    def jarque_bera(self):
+        """
+        Jarque-Bera test of every column
+
+        Returns
+        -------
+        Out     : tuple
+                  (test statistics, p-values)
+
+        """
+        n, _, m2, m3, m4 = self.moments()
+        return BatchedStatistics.jarque_bera(n, *BatchedStatistics.skewness_kurtosis(m2, m3, m4))
+
+    def dagostino_k2(self):
+        """
+        D'Agostino and Pearson's K^2 test of every column, needs at least 8 observations
+
+        Returns
+        -------
+        Out     : tuple
+                  (test statistics, p-values)
+
+        """
+        n, _, m2, m3, m4 = self.moments()
+        return BatchedStatistics.dagostino_k2(n,
+                                              *BatchedStatistics.skewness_kurtosis(m2, m3, m4))
@@ -3,15 +3,19 @@
 __author__ = 'Samir Adrik'
 __email__ = 'samir.adrik@gmail.com'
 
+from source.multivariate_norm.r_worker_pool import RWorkerPool
 from source.multivariate_norm.doornik_hansen import DoornikHansen
 from source.multivariate_norm.henze_zirkler import HenzeZirkler
+from source.multivariate_norm.mvn_batch import MvnBatch
 from source.multivariate_norm.royston import Royston
 from source.multivariate_norm.mardia import Mardia
 from source.multivariate_norm.energy import Energy
+from source.util.normality_results import NormalityResults
 from source.util.generator import Generator
 from source.util.assertor import Assertor
 from prettytable import PrettyTable
 import pandas as pd
+import numpy as np
 
 
 class MultivariateNormality(Generator):
@@ -20,31 +24,125 @@ class MultivariateNormality(Generator):
 
     """
 
-    def __init__(self, df: pd.DataFrame, digits: int = 5):
+    tests = ('mardia skewness', 'mardia kurtosis', 'royston', 'henze-zirkler',
+             'doornik-hansen', 'energy')
+
+    def __init__(self, df: pd.DataFrame, digits: int = 5, backend: str = 'r',
+                 sw: np.ndarray = None, r_workers: int = 0, n_jobs: int = 1, seed: int = None):
         """
         Constructor / Initiate the class
 
         Parameters
         ----------
-        df      : pandas.DataFrame
-                  Dataframe for which one wants to generate / test
-        digits  : int
-                  number of decimal places to round down
+        df          : pandas.DataFrame
+                      Dataframe for which one wants to generate / test
+        digits      : int
+                      number of decimal places to round down
+        backend     : str
+                      'r' to run all tests through the MVN module in r or 'numpy' to run the
+                      native implementations, default is 'r'
+        sw          : numpy.ndarray
+                      Shapiro-Wilk W statistic of every column of df if already computed,
+                      reused by the native Royston test
+        r_workers   : int
+                      number of r worker processes the tests of the 'r' backend run on
+                      concurrently, default is 0, i.e. all tests run one after another in the
+                      embedded r session
+        n_jobs      : int
+                      number of threads running the bootstrap replicates of the native energy
+                      test, -1 uses all cores, default is 1
+        seed        : int
+                      seed of the bootstrap of the native energy test, default is None, i.e.
+                      fresh entropy
 
         """
         super().__init__(digits=digits)
         Assertor.evaluate_pd_dataframe(df)
         Assertor.evaluate_numeric_df(df)
-        Assertor.evaluate_data_type({digits: int})
+        Assertor.evaluate_data_type({digits: int, backend: str, r_workers: int, n_jobs: int})
+        if r_workers < 0:
+            raise ValueError("r_workers must be a non-negative integer, got {}".format(r_workers))
 
         self.df = df
         self.digits = digits
+        self.backend = backend
+        self.sw = sw
+        self.r_workers = r_workers
+        self.n_jobs = n_jobs
+        self.seed = seed
+
+    def normality_test(self, test: type, **kwargs):
+        """
+        Instantiates a multivariate normality test with the configured backend
+
+        Parameters
+        ----------
+        test    : type
+                  subclass of NormalityTest
+        kwargs  : dict
+                  additional keyword arguments passed to the constructor of test
+
+        Returns
+        -------
+        Out     : NormalityTest
+                  instance of test run by the configured backend
+
+        """
+        return test(self.df, backend=self.backend, **kwargs)
 
-    def generate_multivariate_normality_results(self):
+    def multivariate_normality_tests(self):
+        """
+        Runs all multivariate normality tests. With the 'r' backend the df is transferred to r
+        once and all tests run in a single r evaluation, or concurrently on the shared pool of
+        r worker processes if r_workers is positive.
+
+        Returns
+        -------
+        Out     : dict
+                  {test name: (test statistic, p-value, ...)}
+
+        """
+        if self.backend == 'r':
+            if self.r_workers:
+                return RWorkerPool.shared(self.r_workers).run(self.df)
+            return MvnBatch(self.df).print_results()
+
+        return {'mardia': self.normality_test(Mardia).print_results(),
+                'royston': self.normality_test(Royston, sw=self.sw).print_results(),
+                'henze-zirkler': self.normality_test(HenzeZirkler).print_results(),
+                'doornik-hansen': self.normality_test(DoornikHansen).print_results(),
+                'energy': self.normality_test(Energy, n_jobs=self.n_jobs, seed=self.seed,
+                                              executor='thread').print_results()}
+
+    def multivariate_normality_results(self):
+        """
+        Runs all multivariate normality tests and collects their results, Mardia's skewness and
+        kurtosis tests are kept as two separate tests
+
+        Returns
+        -------
+        Out     : NormalityResults
+                  statistics and p-values of every test on the df as a single vector
+
+        """
+        results = self.multivariate_normality_tests()
+        mardia = results['mardia']
+        statistics = [mardia[0], mardia[2]] + [results[name][0] for name in self.tests[2:]]
+        p_values = [mardia[1], mardia[3]] + [results[name][1] for name in self.tests[2:]]
+        return NormalityResults(self.tests, ['df'], np.array(statistics)[:, np.newaxis],
+                                np.array(p_values)[:, np.newaxis], self.digits)
+
+    def generate_multivariate_normality_results(self, results: NormalityResults = None):
         """
         Method that generates multivariate results from a pandas.DataFrame's column or row
         vectors.
 
+        Parameters
+        ----------
+        results : NormalityResults
+                  results of multivariate_normality_results() to be rendered, the tests are
+                  run if not given
+
         Returns
         -------
         Out     : str
@@ -52,6 +150,8 @@ class MultivariateNormality(Generator):
 
         """
         Assertor.evaluate_data_type({self.digits: int})
+        if results is None:
+            results = self.multivariate_normality_results()
 
         multi_norm_table = PrettyTable(vrules=2, hrules=3)
         rnd, d = round, self.digits
@@ -66,27 +166,22 @@ class MultivariateNormality(Generator):
         multi_norm_table.field_names = multi_norm_header_name
 
         # Add Mardia results
-        mardia = Mardia(self.df)
-        mardia_results = mardia.print_results()
+        skewness, p_skewness = results['mardia skewness']
+        kurtosis, p_kurtosis = results['mardia kurtosis']
         multi_norm_mardia_row = ['mardia',
-                                 rnd(mardia_results[0], d),
-                                 self.astrix(rnd(mardia_results[1], d)),
-                                 rnd(mardia_results[2], d),
-                                 self.astrix(rnd(mardia_results[3], d)),
+                                 rnd(skewness[0], d),
+                                 self.astrix(rnd(p_skewness[0], d)),
+                                 rnd(kurtosis[0], d),
+                                 self.astrix(rnd(p_kurtosis[0], d)),
                                  '']
         multi_norm_table.add_row(multi_norm_mardia_row)
 
         # Add rest of the results
-        methods = {'royston': Royston(self.df),
-                   'henze-zirkler': HenzeZirkler(self.df),
-                   'doornik-hansen': DoornikHansen(self.df),
-                   'energy': Energy(self.df)}
-
-        for name, method in methods.items():
-            method_results = method.print_results()
+        for name in ['royston', 'henze-zirkler', 'doornik-hansen', 'energy']:
+            statistic, p_value = results[name]
             multi_norm_row = [name,
-                              rnd(method_results[0], d),
-                              self.astrix(rnd(method_results[1], d)),
+                              rnd(statistic[0], d),
+                              self.astrix(rnd(p_value[0], d)),
                               '', '', ''
                               ]
             multi_norm_table.add_row(multi_norm_row)
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+
+__author__ = 'Samir Adrik'
+__email__ = 'samir.adrik@gmail.com'
+
+import pandas as pd
+import numpy as np
+
+
+class NormalityResults:
+    """
+    Container for the results of a set of normality tests evaluated on one or more vectors,
+    with one row per test and one column per vector
+
+    """
+
+    sign_limits = np.array([0.0001, 0.001, 0.01, 0.05])
+
+    def __init__(self, tests: tuple, labels: list, statistics: np.ndarray, p_values: np.ndarray,
+                 digits: int = 5):
+        """
+        Constructor / Initiate the class
+
+        Parameters
+        ----------
+        tests       : tuple of str
+                      names of the tests
+        labels      : list
+                      labels of the vectors that were tested
+        statistics  : numpy.ndarray
+                      len(tests) x len(labels) array of test statistics
+        p_values    : numpy.ndarray
+                      len(tests) x len(labels) array of p-values
+        digits      : int
+                      number of decimal places the p-values are rounded to before their
+                      significance level is looked up, same as in the rendered tables
+
+        """
+        statistics = np.asarray(statistics, dtype=np.float64)
+        p_values = np.asarray(p_values, dtype=np.float64)
+        shape = (len(tests), len(labels))
+        if statistics.shape != shape or p_values.shape != shape:
+            raise ValueError("statistics and p-values must have shape {}, got {} and {}".format(
+                shape, statistics.shape, p_values.shape))
+
+        self.tests = tuple(tests)
+        self.labels = list(labels)
+        self.statistics = statistics
+        self.p_values = p_values
+        self.digits = digits
+
+    def significance(self):
+        """
+        Significance level of every p-value, i.e. the number of asterisks Generator.astrix()
+        renders for it
+
+        Returns
+        -------
+        Out     : numpy.ndarray
+                  len(tests) x len(labels) array of ints between 0 and 4
+
+        """
+        rounded = np.round(self.p_values, self.digits)
+        levels = len(self.sign_limits) - np.searchsorted(self.sign_limits, rounded, side='left')
+        # bisect_left() places nan first, so Generator.astrix() renders it with all asterisks
+        return np.where(np.isnan(rounded), len(self.sign_limits), levels)
+
+    def conducted(self):
+        """
+        Number of tests conducted, i.e. tests times vectors
+
+        Returns
+        -------
+        Out     : int
+                  number of tests conducted
+
+        """
+        return self.p_values.size
+
+    def passed(self):
+        """
+        Number of tests that rejected normality at the 5% level, i.e. the number of p-values
+        marked with at least one asterisk
+
+        Returns
+        -------
+        Out     : int
+                  number of tests that have passed
+
+        """
+        return int(np.count_nonzero(self.significance()))
+
+    def __getitem__(self, test: str):
+        """
+        Gets the statistics and p-values of one test
+
+        Parameters
+        ----------
+        test    : str
+                  name of the test
+
+        Returns
+        -------
+        Out     : tuple of numpy.ndarray
+                  (test statistics, p-values) with one entry per vector
+
+        """
+        i = self.tests.index(test)
+        return self.statistics[i], self.p_values[i]
+
+    def to_frame(self):
+        """
+        Converts the results into a long table with one row per test and vector
+
+        Returns
+        -------
+        Out     : pandas.DataFrame
+                  columns 'label', 'test', 'statistic', 'p-value' and 'significance'
+
+        """
+        k = len(self.labels)
+        return pd.DataFrame({'label': np.tile(np.asarray(self.labels), len(self.tests)),
+                             'test': np.repeat(np.asarray(self.tests), k),
+                             'statistic': self.statistics.ravel(),
+                             'p-value': self.p_values.ravel(),
+                             'significance': self.significance().ravel()})
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+
+__author__ = 'Samir Adrik'
+__email__ = 'samir.adrik@gmail.com'
+
+from source.util.normality_results import NormalityResults
+from source.util.column_blocks import ColumnBlocks
+from source.util.assertor import Assertor
+import pandas as pd
+import numpy as np
+import tempfile
+import hashlib
+import os
+
+
+class ResultCache:
+    """
+    On-disk cache of normality test results, content addressed by the data of the df and the
+    configuration of the tests. Every entry is a small .npz file with the per-test statistics
+    and p-values, the least recently used entries are evicted once the directory holds more
+    than max_bytes.
+
+    """
+
+    suffix = '.npz'
+
+    @staticmethod
+    def fingerprint(df: pd.DataFrame):
+        """
+        Hashes the numeric buffer, shape and dtype of a df
+
+        Parameters
+        ----------
+        df      : pandas.DataFrame, ColumnBlocks
+                  df to be hashed, out-of-core data is hashed block by block
+
+        Returns
+        -------
+        Out     : str
+                  hex digest identifying the data of df
+
+        """
+        if isinstance(df, ColumnBlocks):
+            return df.fingerprint()
+
+        values = np.ascontiguousarray(df.to_numpy())
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update("{}{}".format(values.shape, values.dtype.str).encode())
+        digest.update(memoryview(values).cast('B'))
+        return digest.hexdigest()
+
+    def __init__(self, directory: str, max_bytes: int = 2 ** 28):
+        """
+        Constructor / Initiate the class
+
+        Parameters
+        ----------
+        directory   : str
+                      directory holding the cache entries, created if missing
+        max_bytes   : int
+                      upper bound of the total size of all entries, default is 256 MiB
+
+        """
+        Assertor.evaluate_data_type({directory: str, max_bytes: int})
+        if max_bytes < 0:
+            raise ValueError("max_bytes must be non-negative, got {}".format(max_bytes))
+
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def key(self, fingerprint: str, config: tuple):
+        """
+        Combines the fingerprint of a df with the configuration of a stage into a cache key
+
+        Parameters
+        ----------
+        fingerprint : str
+                      fingerprint() of the df
+        config      : tuple
+                      configuration of the stage, e.g. (stage, dim, digits, tests, version)
+
+        Returns
+        -------
+        Out         : str
+                      cache key
+
+        """
+        digest = hashlib.blake2b(fingerprint.encode(), digest_size=20)
+        digest.update(repr(config).encode())
+        return digest.hexdigest()
+
+    def path(self, key: str):
+        """
+        Path of the entry stored under key
+
+        Parameters
+        ----------
+        key     : str
+                  cache key
+
+        Returns
+        -------
+        Out     : str
+                  path of the .npz file
+
+        """
+        return os.path.join(self.directory, key + self.suffix)
+
+    def load(self, key: str, labels: list, digits: int):
+        """
+        Loads the results stored under key and marks them as recently used
+
+        Parameters
+        ----------
+        key     : str
+                  cache key
+        labels  : list
+                  labels of the vectors the results belong to
+        digits  : int
+                  number of decimal places of the results
+
+        Returns
+        -------
+        Out     : NormalityResults
+                  cached results, None if there is no entry for key
+
+        """
+        path = self.path(key)
+        try:
+            with np.load(path, allow_pickle=False) as entry:
+                results = NormalityResults(tuple(entry['tests']), labels, entry['statistics'],
+                                           entry['p_values'], digits)
+        except (OSError, KeyError, ValueError):
+            return None
+        os.utime(path)
+        return results
+
+    def store(self, key: str, results: NormalityResults):
+        """
+        Stores results under key and evicts the least recently used entries if the cache
+        has grown beyond max_bytes
+
+        Parameters
+        ----------
+        key     : str
+                  cache key
+        results : NormalityResults
+                  results to be stored
+
+        """
+        descriptor, temporary = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                np.savez(file, tests=np.array(results.tests), statistics=results.statistics,
+                         p_values=results.p_values)
+            os.replace(temporary, self.path(key))
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        self.evict()
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the cache holds at most max_bytes
+
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(self.suffix):
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+            total -= size
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+__author__ = 'Samir Adrik'
+__email__ = 'samir.adrik@gmail.com'
+
+from source.util.assertor import Assertor
+from importlib.util import find_spec
+import pandas as pd
+import os
+
+
+class ResultExporter:
+    """
+    Writes result tables to disk in a columnar format. Parquet and Feather need pyarrow (or
+    fastparquet for Parquet) and are preferred when installed, CSV and JSON always work.
+
+    """
+
+    formats = {'parquet': ('pyarrow', 'fastparquet'),
+               'feather': ('pyarrow',),
+               'csv': (),
+               'json': ()}
+
+    @staticmethod
+    def available(fmt: str):
+        """
+        Checks if the engine needed to write a format is installed
+
+        Parameters
+        ----------
+        fmt     : str
+                  'parquet', 'feather', 'csv' or 'json'
+
+        Returns
+        -------
+        Out     : bool
+                  True if tables can be written in fmt
+
+        """
+        engines = ResultExporter.formats[fmt]
+        return not engines or any(find_spec(engine) is not None for engine in engines)
+
+    def __init__(self, file_dir: str, fmt: str = None):
+        """
+        Constructor / Initiate the class
+
+        Parameters
+        ----------
+        file_dir    : str
+                      directory the tables are written to, created if missing
+        fmt         : str
+                      'parquet', 'feather', 'csv' or 'json', default is the first of them
+                      that is available
+
+        """
+        if fmt is None:
+            fmt = next(fmt for fmt in self.formats if self.available(fmt))
+        Assertor.evaluate_data_type({file_dir: str, fmt: str})
+        if fmt not in self.formats:
+            raise ValueError("fmt must be one of {}, got '{}'".format(tuple(self.formats), fmt))
+        if not self.available(fmt):
+            raise ImportError("writing '{}' requires one of {}".format(
+                fmt, self.formats[fmt]))
+
+        os.makedirs(file_dir, exist_ok=True)
+        self.file_dir = file_dir
+        self.fmt = fmt
+
+    def write(self, frame: pd.DataFrame, name: str):
+        """
+        Writes a table
+
+        Parameters
+        ----------
+        frame   : pandas.DataFrame
+                  table to be written, its index is not written
+        name    : str
+                  file name without extension
+
+        Returns
+        -------
+        Out     : str
+                  path of the written file
+
+        """
+        path = os.path.join(self.file_dir, "{}.{}".format(name, self.fmt))
+        frame = frame.reset_index(drop=True)
+        if self.fmt == 'parquet':
+            frame.to_parquet(path, index=False)
+        elif self.fmt == 'feather':
+            frame.to_feather(path)
+        elif self.fmt == 'csv':
+            frame.to_csv(path, index=False)
+        else:
+            frame.to_json(path, orient='records', lines=True)
+        return path
@@ -3,6 +3,8 @@
 __author__ = 'Samir Adrik'
 __email__ = 'samir.adrik@gmail.com'
 
+from source.util.normality_results import NormalityResults
+from source.util.column_blocks import ColumnBlocks
 from source.util.generator import Generator
 from source.util.assertor import Assertor
 from prettytable import PrettyTable
@@ -11,22 +13,26 @@ import pandas as pd
 
 class ResultGenerator(Generator):
     """
-    Class that generates results from all statistical tests
+    Class that generates results from all statistical tests. The multivariate and univariate
+    results are passed as NormalityResults, not as the rendered tables (str) of earlier
+    versions, and the counts are read from their p-values instead of from the asterisks of
+    the tables.
 
     """
 
-    def __init__(self, df: pd.DataFrame, mn: str, un: str, dim: str = 'col', digits: int = 5):
+    def __init__(self, df: pd.DataFrame, mn: NormalityResults, un: NormalityResults,
+                 dim: str = 'col', digits: int = 5):
         """
         Constructor / Initiate the class
 
         Parameters
         ----------
-        df      : pandas.DataFrame
+        df      : pandas.DataFrame, ColumnBlocks
                   DataFrame used for analysis
-        mn      : str
-                  string with all the results from the multivariate normality tests
-        un      : str
-                  string with all the results from the univariate normality tests
+        mn      : NormalityResults
+                  results of the multivariate normality tests
+        un      : NormalityResults
+                  results of the univariate normality tests
         dim     : str
                   indicate whether one wants to test for normality along the columns 'col' or rows
                   'row', default is 'col'
@@ -35,9 +41,11 @@ class ResultGenerator(Generator):
 
         """
         super().__init__(dim=dim, digits=digits)
-        Assertor.evaluate_pd_dataframe(df)
-        Assertor.evaluate_numeric_df(df)
-        Assertor.evaluate_data_type({mn: str, un: str, dim: str, digits: int})
+        if not isinstance(df, ColumnBlocks):
+            Assertor.evaluate_pd_dataframe(df)
+            Assertor.evaluate_numeric_df(df)
+        Assertor.evaluate_data_type({mn: NormalityResults, un: NormalityResults, dim: str,
+                                     digits: int})
 
         self.df = df
         self.mn = mn
@@ -45,6 +53,40 @@ class ResultGenerator(Generator):
         self.dim = dim
         self.digits = digits
 
+    def result_summary(self):
+        """
+        Counts the conducted and conclusive tests of both stages from their significance levels
+
+        Returns
+        -------
+        out         : dict
+                      {'multivariate': (conducted, conclusive), 'univariate': (conducted,
+                      conclusive)}
+
+        """
+        return {'multivariate': (self.mn.conducted(), self.mn.passed()),
+                'univariate': (self.un.conducted(), self.un.passed())}
+
+    def result_summary_frame(self):
+        """
+        Counts of conducted, conclusive and inconclusive tests per stage as a table
+
+        Returns
+        -------
+        out         : pandas.DataFrame
+                      one row for 'multivariate', 'univariate' and 'total'
+
+        """
+        counts = self.result_summary()
+        conducted = [counts['multivariate'][0], counts['univariate'][0]]
+        conclusive = [counts['multivariate'][1], counts['univariate'][1]]
+        conducted.append(sum(conducted))
+        conclusive.append(sum(conclusive))
+        frame = pd.DataFrame({'stage': ['multivariate', 'univariate', 'total'],
+                              'conducted': conducted, 'conclusive': conclusive})
+        frame['inconclusive'] = frame['conducted'] - frame['conclusive']
+        return frame
+
     def generate_result_summary(self):
         """
         Summaries results of statistical tests
@@ -52,18 +94,18 @@ class ResultGenerator(Generator):
         Returns
         -------
         out         : tuple
-                      (summary, un, mn-objects)
+                      (summary, mn, un), the summary of all tests as a string and the
+                      multivariate and univariate NormalityResults given to the constructor
 
         """
         rnd, d = round, self.digits
+        counts = self.result_summary()
 
-        mn_tot = 6
-        mn_pass = self.count_astrix(self.mn)
+        mn_tot, mn_pass = counts['multivariate']
         mn_fail = mn_tot - mn_pass
         mn_pr, mn_fr = rnd(mn_pass / mn_tot, d), rnd(1 - mn_pass / mn_tot, d)
 
-        un_tot = 4 * self.df.shape[1] if self.dim == 'col' else 4 * self.df.shape[0]
-        un_pass = self.count_astrix(self.un)
+        un_tot, un_pass = counts['univariate']
         un_fail = un_tot - un_pass
         un_pr, un_fr = rnd(un_pass / un_tot, d), rnd(1 - un_pass / un_tot, d)
 
@@ -80,7 +122,8 @@ class ResultGenerator(Generator):
                                '  (i-rate)'
                                ]
 
-        summary.add_row(['  multivariate', '6', str(mn_pass), str(mn_pr), str(mn_fail), str(mn_fr)])
+        summary.add_row(
+            ['  multivariate', str(mn_tot), str(mn_pass), str(mn_pr), str(mn_fail), str(mn_fr)])
         summary.add_row(
             ['  univariate', un_tot, str(un_pass), str(un_pr), str(un_fail), str(un_fr)])
 
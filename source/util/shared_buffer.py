@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+
+__author__ = 'Samir Adrik'
+__email__ = 'samir.adrik@gmail.com'
+
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import weakref
+
+
+class SharedBuffer:
+    """
+    Float array in shared memory together with the process pool whose workers read column
+    chunks of it. The vectors are only copied into shared memory when they change and the
+    pool is started on first use, so that all stages of a battery, and all blocks of
+    out-of-core data, run on the same memory and the same worker processes. The memory is
+    released and the pool shut down by close(), or when the buffer is garbage collected.
+
+    """
+
+    @staticmethod
+    def chunk(function, name: str, shape: tuple, dtype: str, transpose: bool, start: int,
+              stop: int):
+        """
+        Attaches to the array in shared memory and applies function to a chunk of its
+        columns, runs in the worker processes of map()
+
+        Parameters
+        ----------
+        function    : callable
+                      function taking an n x k array and returning a tuple of arrays of
+                      length k
+        name        : str
+                      name of the shared memory block holding the array
+        shape       : tuple
+                      shape of the array in shared memory
+        dtype       : str
+                      'float32' or 'float64', dtype of the array in shared memory
+        transpose   : bool
+                      whether the vectors are the rows of the array in shared memory
+        start       : int
+                      first column of the chunk
+        stop        : int
+                      column after the last column of the chunk
+
+        Returns
+        -------
+        Out         : tuple of numpy.ndarray
+                      results of function for the chunk
+
+        """
+        from multiprocessing import shared_memory
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+            vectors = array.T if transpose else array
+            results = tuple(np.array(result) for result in function(vectors[:, start:stop]))
+            del array, vectors
+            return results
+        finally:
+            shm.close()
+
+    @staticmethod
+    def release(state: dict):
+        """
+        Shuts down the process pool and frees the shared memory of a buffer
+
+        Parameters
+        ----------
+        state   : dict
+                  {'shm': SharedMemory or None, 'pool': ProcessPoolExecutor or None}
+
+        """
+        if state['pool'] is not None:
+            state['pool'].shutdown()
+            state['pool'] = None
+        if state['shm'] is not None:
+            state['shm'].close()
+            state['shm'].unlink()
+            state['shm'] = None
+
+    def __init__(self):
+        """
+        Constructor / Initiate the class
+
+        """
+        self.state = {'shm': None, 'pool': None}
+        self.shape = None
+        self.dtype = None
+        self.source = None
+        self.n_jobs = 0
+        self.finalizer = weakref.finalize(self, SharedBuffer.release, self.state)
+
+    def load(self, vectors: np.ndarray, source=None):
+        """
+        Copies vectors into shared memory, which is only reallocated if vectors do not fit.
+        Nothing is copied if source is the source of the vectors already held.
+
+        Parameters
+        ----------
+        vectors : numpy.ndarray
+                  n x k float32 or float64 array, every column is one vector
+        source  : object
+                  object vectors are read from, e.g. the df of a battery, None if the
+                  vectors are not read from a fixed source, e.g. blocks of out-of-core data
+
+        """
+        if not self.finalizer.alive:
+            raise ValueError("shared buffer has been closed")
+        if source is not None and source is self.source:
+            return
+
+        from multiprocessing import shared_memory
+        # rows of the transposed, C-contiguous array are the vectors in row mode
+        transpose = not vectors.flags.c_contiguous and vectors.T.flags.c_contiguous
+        array = vectors.T if transpose else vectors
+        shm = self.state['shm']
+        if shm is None or shm.size < array.nbytes:
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+            self.state['shm'] = None
+            shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            self.state['shm'] = shm
+        np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[:] = array
+        self.shape = array.shape
+        self.dtype = array.dtype.name
+        self.source = source
+
+    def executor(self, n_jobs: int):
+        """
+        Gets the process pool, which is started on first use and only restarted if more
+        workers are requested
+
+        Parameters
+        ----------
+        n_jobs  : int
+                  number of worker processes needed
+
+        Returns
+        -------
+        Out     : concurrent.futures.ProcessPoolExecutor
+                  process pool of the buffer
+
+        """
+        if self.state['pool'] is None or self.n_jobs < n_jobs:
+            if self.state['pool'] is not None:
+                self.state['pool'].shutdown()
+            self.state['pool'] = ProcessPoolExecutor(max_workers=n_jobs)
+            self.n_jobs = n_jobs
+        return self.state['pool']
+
+    def map(self, function, vectors: np.ndarray, bounds: np.ndarray):
+        """
+        Applies function to chunks of columns of the vectors held in shared memory on the
+        process pool
+
+        Parameters
+        ----------
+        function    : callable
+                      function taking an n x k array and returning a tuple of arrays of
+                      length k, must be picklable
+        vectors     : numpy.ndarray
+                      vectors passed to load(), or a view of them, e.g. transposed
+        bounds      : numpy.ndarray
+                      column bounds of the chunks, one chunk per worker process
+
+        Returns
+        -------
+        Out         : list of tuple
+                      results of function per chunk
+
+        """
+        transpose = not vectors.flags.c_contiguous and vectors.T.flags.c_contiguous
+        if self.state['shm'] is None or (vectors.T if transpose else vectors).shape != self.shape:
+            raise ValueError("vectors of shape {} are not held by the shared buffer of shape "
+                             "{}".format(vectors.shape, self.shape))
+
+        n_chunks = len(bounds) - 1
+        return list(self.executor(n_chunks).map(
+            SharedBuffer.chunk, [function] * n_chunks, [self.state['shm'].name] * n_chunks,
+            [self.shape] * n_chunks, [self.dtype] * n_chunks, [transpose] * n_chunks,
+            bounds[:-1], bounds[1:]))
+
+    def close(self):
+        """
+        Shuts down the process pool and frees the shared memory
+
+        """
+        self.source = None
+        self.finalizer()
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+__author__ = 'Samir Adrik'
+__email__ = 'samir.adrik@gmail.com'
+
+from source.util.assertor import Assertor
+from itertools import islice
+import io
+
+
+class TableWriter:
+    """
+    Writes right-aligned tables in the layout of PrettyTable(vrules=NONE) row by row to a file.
+    The column widths are taken from a single pass over the formatted cells, so no table object
+    holding all rows has to be built.
+
+    """
+
+    def __init__(self, field_names: list, frame: bool = True, chunk_size: int = 4096):
+        """
+        Constructor / Initiate the class
+
+        Parameters
+        ----------
+        field_names : list of str
+                      header of every column
+        frame       : bool
+                      draw horizontal rules above the header and below the last row, like
+                      hrules=FRAME, otherwise only below the header, like hrules=HEADER
+        chunk_size  : int
+                      number of rows joined into a single write
+
+        """
+        Assertor.evaluate_data_type({frame: bool, chunk_size: int})
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be a positive integer, got {}".format(chunk_size))
+
+        self.field_names = list(field_names)
+        self.frame = frame
+        self.chunk_size = chunk_size
+
+    def write(self, file, columns: list):
+        """
+        Writes the table to file, without a trailing newline
+
+        Parameters
+        ----------
+        file    : file object
+                  text file the table is written to
+        columns : list of list of str
+                  formatted cells, one list per column in the order of field_names
+
+        """
+        if len(columns) != len(self.field_names):
+            raise ValueError("expected {} columns, got {}".format(len(self.field_names),
+                                                                 len(columns)))
+
+        widths = [max([len(name)] + [len(cell) for cell in column])
+                  for name, column in zip(self.field_names, columns)]
+        hrule = '-' + ''.join('-' * (width + 3) for width in widths)
+        row = ' ' + ''.join(' {:>%d}  ' % width for width in widths)
+
+        if self.frame:
+            file.write(hrule + '\n')
+        file.write(row.format(*self.field_names) + '\n' + hrule)
+
+        rows = zip(*columns)
+        chunk = list(islice(rows, self.chunk_size))
+        while chunk:
+            file.write(''.join('\n' + row.format(*cells) for cells in chunk))
+            chunk = list(islice(rows, self.chunk_size))
+        if self.frame:
+            file.write('\n' + hrule)
+
+    def render(self, columns: list):
+        """
+        Renders the table as a string
+
+        Parameters
+        ----------
+        columns : list of list of str
+                  formatted cells, one list per column in the order of field_names
+
+        Returns
+        -------
+        Out     : str
+                  the table
+
+        """
+        buffer = io.StringIO()
+        self.write(buffer, columns)
+        return buffer.getvalue()
@@ -3,11 +3,15 @@
 __author__ = 'Samir Adrik'
 __email__ = 'samir.adrik@gmail.com'
 
+from source.util.batched_statistics import BatchedStatistics
+from source.util.normality_results import NormalityResults
+from source.util.table_writer import TableWriter
+from source.util.column_blocks import ColumnBlocks
+from source.util.shared_buffer import SharedBuffer
 from source.util.generator import Generator
 from source.util.assertor import Assertor
-from prettytable import PrettyTable
-import scipy.stats as stats
 import pandas as pd
+import numpy as np
 
 
 class UnivariateNormality(Generator):
@@ -16,42 +20,104 @@ class UnivariateNormality(Generator):
 
     """
 
-    def __init__(self, df: pd.DataFrame, dim: str = 'col', digits: int = 5):
+    tests = ('jb', 'k2', 'ks', 'sw')
+
+    @staticmethod
+    def univariate_statistics(vectors: np.ndarray):
+        """
+        Runs the Jarque-Bera, D’Agostino / Pearson’s, Kolmogorov–Smirnov and Shapiro-Wilk
+        tests on every column of vectors
+
+        Parameters
+        ----------
+        vectors : numpy.ndarray
+                  n x k array, every column is one vector
+
+        Returns
+        -------
+        Out     : tuple of numpy.ndarray
+                  (jb, p_jb, k2, p_k2, ks, p_ks, sw, p_sw) with one entry per vector
+
+        """
+        n, _, m2, m3, m4 = BatchedStatistics.moments(vectors)
+        skewness, kurtosis = BatchedStatistics.skewness_kurtosis(m2, m3, m4)
+        return (BatchedStatistics.jarque_bera(n, skewness, kurtosis)
+                + BatchedStatistics.dagostino_k2(n, skewness, kurtosis)
+                + BatchedStatistics.kolmogorov_smirnov(vectors)
+                + BatchedStatistics.shapiro_wilk(vectors))
+
+    def __init__(self, df: pd.DataFrame, dim: str = 'col', digits: int = 5, n_jobs: int = 1,
+                 executor: str = 'thread', shared: SharedBuffer = None):
         """
         Constructor / Initiate the class
 
         Parameters
         ----------
-        df      : pandas.DataFrame
-                  Dataframe for which one wants to generate / test
-        dim     : str
-                  indicate whether one wants to test for normality along the columns 'col' or rows
-                  'row', default is 'col'
-        digits  : int
-                  number of decimal places to round down
+        df          : pandas.DataFrame, ColumnBlocks
+                      Dataframe for which one wants to generate / test, or out-of-core data
+                      read one block of vectors at a time
+        dim         : str
+                      indicate whether one wants to test for normality along the columns 'col'
+                      or rows 'row', default is 'col'
+        digits      : int
+                      number of decimal places to round down
+        n_jobs      : int
+                      number of threads or processes the vectors are split across, -1 uses
+                      all cores, default is 1
+        executor    : str
+                      'thread' or 'process', the process pool reads the vectors from shared
+                      memory, default is 'thread'
+        shared      : SharedBuffer
+                      shared memory and process pool kept across stages, e.g. by
+                      NormalityBattery, default is None, i.e. created per call
 
         """
         super().__init__(dim=dim, digits=digits)
-        Assertor.evaluate_pd_dataframe(df)
-        Assertor.evaluate_numeric_df(df)
+        if not isinstance(df, ColumnBlocks):
+            Assertor.evaluate_pd_dataframe(df)
+            Assertor.evaluate_numeric_df(df)
         Assertor.evaluate_data_type({dim: str, digits: int})
 
         self.df = df
         self.dim = dim
         self.digits = digits
+        self.n_jobs = n_jobs
+        self.executor = executor
+        self.shared = shared
 
-    def generate_univariate_normality_results(self):
+    def univariate_normality_results(self):
         """
-        Method that generates univariate normality results from a pandas.DataFrame's column or row
-        vectors.
+        Runs the Jarque-Bera, D'Agostino K^2, Kolmogorov-Smirnov and Shapiro-Wilk tests on
+        all of a pandas.DataFrame's column or row vectors.
 
         Returns
         -------
-        Out     : str
-                  String of univariate normality results
+        Out     : NormalityResults
+                  statistics and p-values of the tests 'jb', 'k2', 'ks' and 'sw' per vector
+
+        """
+        labels = self.df.columns if self.dim == "col" else self.df.index
+        results = self.map_vectors(self.univariate_statistics, self.df, self.dim, self.n_jobs,
+                                   self.executor, self.shared)
+        return NormalityResults(self.tests, labels, results[0::2], results[1::2],
+                                self.digits)
+
+    def univariate_normality_table(self, results: NormalityResults):
+        """
+        Formats the univariate normality results as the columns of a table, p-values are marked
+        with their significance in astrix notation
+
+        Parameters
+        ----------
+        results : NormalityResults
+                  results of univariate_normality_results()
+
+        Returns
+        -------
+        Out     : tuple
+                  (TableWriter, list of formatted columns)
 
         """
-        unorm_table = PrettyTable(vrules=2)
         rnd, d = round, self.digits
         dim_name = 'col' if self.dim == 'col' else 'row'
 
@@ -61,20 +127,54 @@ class UnivariateNormality(Generator):
                              '        k2', 'p-value (k2)',
                              '        ks', 'p-value (ks)',
                              '        sw', 'p-value (sw)']
-        unorm_table.field_names = norm_header_names
-
-        vectors = self.df.iteritems() if self.dim == "col" else self.df.iterrows()
-        for i, vector in vectors:
-            jb, p_jb = stats.jarque_bera(vector)
-            k2, p_pr, = stats.normaltest(vector)
-            ks, p_ks = stats.kstest(vector, cdf='norm')
-            sw, p_sw = stats.shapiro(vector)
-            norm_row = ['', rnd(i + 1, d),
-                        rnd(jb, d), self.astrix(rnd(p_jb, d)),
-                        rnd(k2, d), self.astrix(rnd(p_pr, d)),
-                        rnd(ks, d), self.astrix(rnd(p_ks, d)),
-                        rnd(sw, d), self.astrix(rnd(p_sw, d))]
-
-            unorm_table.add_row(norm_row)
-        unorm_table.align = "r"
-        return str(unorm_table)
+
+        columns = [[''] * len(results.labels), [str(rnd(i + 1, d)) for i in results.labels]]
+        for statistics, p_values, stars in zip(results.statistics, results.p_values,
+                                               results.significance()):
+            columns.append(self.format_column(statistics, d))
+            columns.append([p_value + '*' * star for p_value, star in
+                            zip(self.format_column(p_values, d), stars.tolist())])
+        return TableWriter(norm_header_names), columns
+
+    def generate_univariate_normality_results(self, results: NormalityResults = None):
+        """
+        Method that generates univariate normality results from a pandas.DataFrame's column or row
+        vectors.
+
+        Parameters
+        ----------
+        results : NormalityResults
+                  results of univariate_normality_results() to be rendered, the tests are run
+                  if not given
+
+        Returns
+        -------
+        Out     : str
+                  String of univariate normality results
+
+        """
+        if results is None:
+            results = self.univariate_normality_results()
+
+        table, columns = self.univariate_normality_table(results)
+        return table.render(columns)
+
+    def write_univariate_normality_results(self, file, results: NormalityResults = None):
+        """
+        Writes the univariate normality results row by row to file, same layout as
+        generate_univariate_normality_results()
+
+        Parameters
+        ----------
+        file    : file object
+                  text file the results are written to
+        results : NormalityResults
+                  results of univariate_normality_results() to be written, the tests are run
+                  if not given
+
+        """
+        if results is None:
+            results = self.univariate_normality_results()
+
+        table, columns = self.univariate_normality_table(results)
+        table.write(file, columns)
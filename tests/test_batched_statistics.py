@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+__author__ = 'Samir Adrik'
+__email__ = 'samir.adrik@gmail.com'
+
+from source.exceptions.base_class_cannot_be_instantiated import BaseClassCannotBeInstantiated
+from source.util.batched_statistics import BatchedStatistics
+from source.util.dataframe_generator import DataFrameGenerator
+import scipy.stats as stats
+import numpy as np
+import pytest as pt
+
+
+class TestBatchedStatistics:
+
+    @pt.fixture(autouse=True)
+    def setup(self):
+        """
+        Executed before all tests
+
+        """
+        dfg = DataFrameGenerator(seed=90210, size=(50, 20))
+        self.arrays = [np.asarray(getattr(dfg, method)(), dtype=np.float64)
+                       for method in dfg.__getmethods__()]
+
+    def test_batched_statistics_cannot_be_instantiated(self):
+        """
+        Test that BatchedStatistics cannot be instantiated, i.e. an
+        BaseClassCannotBeInstantiated exception is thrown
+
+        """
+        with pt.raises(BaseClassCannotBeInstantiated):
+            BatchedStatistics()
+
+    def test_jarque_bera_and_k2_equal_scipy_for_every_column(self):
+        """
+        Test that the batched Jarque-Bera and D'Agostino K^2 tests give the same statistics and
+        p-values as scipy.stats.jarque_bera() and scipy.stats.normaltest() column by column
+
+        """
+        for x in self.arrays:
+            n, _, m2, m3, m4 = BatchedStatistics.moments(x)
+            skewness, kurtosis = BatchedStatistics.skewness_kurtosis(m2, m3, m4)
+            jb = BatchedStatistics.jarque_bera(n, skewness, kurtosis)
+            k2 = BatchedStatistics.dagostino_k2(n, skewness, kurtosis)
+            for j in range(x.shape[1]):
+                assert np.allclose([jb[0][j], jb[1][j]], stats.jarque_bera(x[:, j]))
+                assert np.allclose([k2[0][j], k2[1][j]], stats.normaltest(x[:, j]))
+
+    def test_value_error_raised_when_k2_gets_less_than_eight_observations(self):
+        """
+        Test that ValueError is raised when the D'Agostino K^2 test gets too few observations
+
+        """
+        with pt.raises(ValueError):
+            BatchedStatistics.dagostino_k2(7, np.zeros(3), np.zeros(3))
+
+    def test_kolmogorov_smirnov_equals_scipy_for_every_column(self):
+        """
+        Test that the batched Kolmogorov-Smirnov test gives the same statistics and p-values as
+        scipy.stats.kstest() column by column, for small samples and samples above 10000
+
+        """
+        large = np.random.RandomState(90210).standard_normal((12000, 3))
+        for x in self.arrays + [large]:
+            ks = BatchedStatistics.kolmogorov_smirnov(x)
+            for j in range(x.shape[1]):
+                assert np.allclose([ks[0][j], ks[1][j]],
+                                   stats.kstest(x[:, j], cdf='norm')[:2], rtol=1e-10)
+
+    def test_kolmogorov_smirnov_on_transposed_rows_with_ties(self):
+        """
+        Test that the Kolmogorov-Smirnov test on the transposed view of many short rows with
+        repeated statistics equals scipy.stats.kstest() row by row and the test on a copy
+
+        """
+        x = np.random.RandomState(90210).randint(-3, 4, size=(2000, 12)).astype(np.float64)
+        ks = BatchedStatistics.kolmogorov_smirnov(x.T)
+        for a, b in zip(ks, BatchedStatistics.kolmogorov_smirnov(np.array(x.T, order='C'))):
+            assert np.array_equal(a, b)
+        for i in range(0, len(x), 97):
+            assert np.allclose([ks[0][i], ks[1][i]], stats.kstest(x[i], cdf='norm'))
+
+    def test_shapiro_wilk_equals_scipy_for_every_column(self):
+        """
+        Test that the batched Shapiro-Wilk test gives the same statistics and p-values as
+        scipy.stats.shapiro() column by column, for small and large samples
+
+        """
+        for n in [3, 4, 5, 6, 11, 12, 50]:
+            for x in self.arrays:
+                sw = BatchedStatistics.shapiro_wilk(x[:n])
+                for j in range(x.shape[1]):
+                    assert np.allclose([sw[0][j], sw[1][j]], stats.shapiro(x[:n, j]))
+
+    def test_shapiro_wilk_coefficients_are_cached_per_sample_size(self):
+        """
+        Test that the Shapiro-Wilk coefficients are computed once per sample size and cannot be
+        modified by callers
+
+        """
+        coefficients = BatchedStatistics.shapiro_wilk_coefficients(50)
+        assert BatchedStatistics.shapiro_wilk_coefficients(50) is coefficients
+        assert not coefficients.flags.writeable
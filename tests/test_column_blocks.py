@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+__author__ = 'Samir Adrik'
+__email__ = 'samir.adrik@gmail.com'
+
+from source.exceptions.only_numeric_df_accepted import OnlyNumericDfAccepted
+from source.util.dataframe_generator import DataFrameGenerator
+from source.util.column_blocks import ColumnBlocks
+from source.normality_battery import NormalityBattery
+import numpy as np
+import pytest as pt
+
+
+class TestColumnBlocks:
+
+    @pt.fixture(autouse=True)
+    def setup(self, tmp_path):
+        """
+        Executed before all tests
+
+        """
+        self.df = DataFrameGenerator(seed=90210, size=(60, 25)).mixed_data_frame()
+        self.path = str(tmp_path / 'df.npy')
+        np.save(self.path, self.df.to_numpy())
+
+    def test_blocks_cover_all_vectors(self):
+        """
+        Test that the column and row blocks of a memory-mapped .npy file hold all vectors in
+        order, and that the last block may be smaller
+
+        """
+        blocks = ColumnBlocks(self.path, block_size=7)
+        assert blocks.shape == self.df.shape
+        assert [block.shape[1] for block in blocks.blocks('col')] == [7, 7, 7, 4]
+        assert np.array_equal(np.hstack(list(blocks.blocks('col'))), self.df.to_numpy())
+        assert np.array_equal(np.hstack(list(blocks.blocks('row'))), self.df.to_numpy().T)
+
+    def test_sample_is_bounded_and_reproducible(self):
+        """
+        Test that the in-memory sample holds at most sample_size rows of the data in their
+        original order, and all rows if there are fewer
+
+        """
+        blocks = ColumnBlocks(np.load(self.path, mmap_mode='r'), sample_size=10)
+        sample = blocks.sample()
+        assert sample.shape == (10, self.df.shape[1])
+        assert list(sample.index) == sorted(sample.index)
+        assert np.array_equal(sample.to_numpy(), self.df.to_numpy()[sample.index])
+        assert sample.equals(blocks.sample())
+        assert ColumnBlocks(self.path).sample().shape == self.df.shape
+
+    def test_errors_raised_for_invalid_sources(self):
+        """
+        Test that unsupported files and non-numeric or non 2-D arrays are rejected
+
+        """
+        with pt.raises(TypeError):
+            ColumnBlocks('df.csv')
+        with pt.raises(OnlyNumericDfAccepted):
+            ColumnBlocks(np.array([['a', 'b'], ['c', 'd']]))
+        with pt.raises(ValueError):
+            ColumnBlocks(np.zeros(10))
+        with pt.raises(ValueError):
+            ColumnBlocks(self.path, block_size=0)
+
+    def test_out_of_core_battery_equals_in_memory_battery(self):
+        """
+        Test that a battery reading a .npy file block by block gives the same univariate and
+        descriptive tables as a battery on the df
+
+        """
+        in_memory = NormalityBattery(self.df)
+        out_of_core = NormalityBattery(ColumnBlocks(self.path, block_size=4))
+        for dim in ['col', 'row']:
+            assert (out_of_core.univariate_normality(dim=dim)
+                    == in_memory.univariate_normality(dim=dim))
+            assert (out_of_core.descriptive_statistics(dim=dim)
+                    == in_memory.descriptive_statistics(dim=dim))
+
+    def test_cached_multivariate_results_depend_on_the_sample(self, tmp_path):
+        """
+        Test that batteries on the same file but with another sample size or seed do not get
+        each other's cached multivariate results
+
+        """
+        cache_dir = str(tmp_path / 'cache')
+
+        def mardia(sample_size, seed=90210, cache=True):
+            nb = NormalityBattery(ColumnBlocks(self.path, sample_size=sample_size, seed=seed),
+                                  cache_dir=cache_dir if cache else None)
+            return nb.normality_results(backend='numpy')[1][1]['mardia skewness'][0][0]
+
+        first = mardia(50)
+        assert mardia(50) == first
+        assert mardia(40) == mardia(40, cache=False) != first
+        assert mardia(40, seed=1) == mardia(40, seed=1, cache=False)
+
+    def test_hdf5_file_is_closed_by_close_and_when_the_battery_replaces_it(self, tmp_path):
+        """
+        Test that the HDF5 file of a ColumnBlocks is closed when its with block is left, and
+        when a battery replaces the ColumnBlocks it opened itself, but not one passed to it
+
+        """
+        h5py = pt.importorskip('h5py')
+        path = str(tmp_path / 'df.h5')
+        with h5py.File(path, 'w') as file:
+            file.create_dataset('df', data=self.df.to_numpy())
+
+        with ColumnBlocks(path) as blocks:
+            assert np.array_equal(np.hstack(list(blocks.blocks('col'))), self.df.to_numpy())
+            assert blocks.file.id.valid
+        assert not blocks.file.id.valid
+
+        nb = NormalityBattery(path)
+        opened = nb.df
+        passed = ColumnBlocks(path)
+        nb.df = passed
+        assert not opened.file.id.valid
+        nb.df = self.df
+        assert passed.file.id.valid
+        passed.close()
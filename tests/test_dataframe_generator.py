@@ -89,13 +89,14 @@ class TestDataFrameGenerator(TestSetup):
         except OSError:
             pass
 
-    def test_os_error_is_thrown_when_dir_cannot_be_created(self):
+    def test_os_error_is_thrown_when_dir_cannot_be_created(self, tmp_path):
         """
         OSError raised when invalid file_dir is passed to to_excel() method
 
         """
         input_df = pd.DataFrame(np.random.rand(30, 30))
-        invalid_file_dir = '._?`/1234'  # Invalid dir name
+        (tmp_path / 'file').touch()
+        invalid_file_dir = str(tmp_path / 'file' / '1234')  # dir below a file
         with pt.raises(OSError):
             self.dfg.to_excel(df=input_df, file_dir=invalid_file_dir)
 
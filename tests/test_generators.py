@@ -8,11 +8,16 @@ from source.exceptions.only_numeric_df_accepted import OnlyNumericDfAccepted
 from source.util.multivariate_normality import MultivariateNormality
 from source.util.descriptive_statistics import DescriptiveStatistics
 from source.util.univariate_normality import UnivariateNormality
+from source.util.normality_results import NormalityResults
 from source.util.result_generator import ResultGenerator
 from source.util.generator import Generator
+from source.normality_battery import NormalityBattery
 from tests.test_setup import TestSetup
 
+from prettytable import PrettyTable
+import scipy.stats as stats
 import pandas as pd
+import numpy as np
 import pytest as pt
 
 
@@ -49,10 +54,31 @@ class TestGenerators(TestSetup):
                     assert isinstance(generator(df), Generator)
                     assert issubclass(generator(df).__class__, Generator)
                 else:
-                    assert isinstance(generator(df, mn='test', un='test'), Generator)
-                    assert issubclass(generator(df, mn='test', un='test').__class__,
+                    results = NormalityResults(('test',), ['df'], [[0.0]], [[1.0]])
+                    assert isinstance(generator(df, mn=results, un=results), Generator)
+                    assert issubclass(generator(df, mn=results, un=results).__class__,
                                       Generator)
 
+    def test_result_generator_takes_normality_results_and_returns_summary_tuple(self):
+        """
+        Test that ResultGenerator takes the NormalityResults of both stages, not their rendered
+        tables, and that generate_result_summary() returns the summary string together with
+        them
+
+        """
+        for df in self.dfs.values():
+            un = UnivariateNormality(df)
+            un_results = un.univariate_normality_results()
+            mn_results = NormalityResults(('test',), ['df'], [[0.0]], [[0.01]])
+            summary, mn, un_out = ResultGenerator(df, mn_results,
+                                                  un_results).generate_result_summary()
+            assert isinstance(summary, str)
+            assert mn is mn_results and un_out is un_results
+            assert str(un_results.conducted()) in summary
+            with pt.raises(TypeError):
+                ResultGenerator(df, mn=str(mn_results.to_frame()),
+                                un=un.generate_univariate_normality_results(un_results))
+
     @pt.mark.parametrize("invalid_df", [{}, [], (), 'test', True])
     def test_typeerror_raised_when_non_pd_data_frame_passed_into_constructor(self, invalid_df):
         """
@@ -113,3 +139,98 @@ class TestGenerators(TestSetup):
                     pd.testing.assert_frame_equal(df, generator.df)
                     assert generator.dim == 'col'
                     assert generator.digits == 5
+
+    @pt.mark.parametrize("invalid_n_jobs", [0, -2])
+    def test_value_error_raised_when_n_jobs_is_invalid(self, invalid_n_jobs):
+        """
+        Test that ValueError is raised when the number of threads is neither -1 nor positive
+
+        """
+        for df in self.dfs.values():
+            with pt.raises(ValueError):
+                DescriptiveStatistics(df, n_jobs=invalid_n_jobs).generate_descriptive_statistics()
+            with pt.raises(ValueError):
+                UnivariateNormality(df, n_jobs=invalid_n_jobs) \
+                    .generate_univariate_normality_results()
+
+    def test_threaded_results_equal_sequential_results(self):
+        """
+        Test that splitting the vectors across threads gives the same tables as processing them
+        sequentially
+
+        """
+        for df in self.dfs.values():
+            for dim in ['col', 'row']:
+                assert (UnivariateNormality(df, dim=dim).generate_univariate_normality_results()
+                        == UnivariateNormality(df, dim=dim, n_jobs=3)
+                        .generate_univariate_normality_results())
+                assert (DescriptiveStatistics(df, dim=dim).generate_descriptive_statistics()
+                        == DescriptiveStatistics(df, dim=dim, n_jobs=3)
+                        .generate_descriptive_statistics())
+
+    def test_value_error_raised_when_executor_is_invalid(self):
+        """
+        Test that ValueError is raised when the executor is neither 'thread' nor 'process'
+
+        """
+        df = list(self.dfs.values())[0]
+        with pt.raises(ValueError):
+            DescriptiveStatistics(df, executor='fork').generate_descriptive_statistics()
+        with pt.raises(ValueError):
+            UnivariateNormality(df, executor='fork').generate_univariate_normality_results()
+
+    def test_process_results_equal_threaded_results(self):
+        """
+        Test that sharding the vectors across processes over shared memory gives the same tables
+        as splitting them across threads
+
+        """
+        df = list(self.dfs.values())[0]
+        for dim in ['col', 'row']:
+            assert (UnivariateNormality(df, dim=dim, n_jobs=2)
+                    .generate_univariate_normality_results()
+                    == UnivariateNormality(df, dim=dim, n_jobs=2, executor='process')
+                    .generate_univariate_normality_results())
+            assert (DescriptiveStatistics(df, dim=dim, n_jobs=2).generate_descriptive_statistics()
+                    == DescriptiveStatistics(df, dim=dim, n_jobs=2, executor='process')
+                    .generate_descriptive_statistics())
+
+    @pt.mark.parametrize("n", [1, 2, 7, 8])
+    def test_descriptive_statistics_equal_numpy_and_scipy(self, n):
+        """
+        Test that the single-pass descriptive statistics equal the numpy and scipy reductions
+        for odd and even sample sizes, and propagate nan like np.median / np.min / np.max
+
+        """
+        vectors = np.random.RandomState(90210).normal(size=(n, 6))
+        vectors[0, 5] = np.nan
+        expected = (np.mean(vectors, axis=0), np.median(vectors, axis=0),
+                    np.var(vectors, axis=0), np.std(vectors, axis=0),
+                    stats.kurtosis(vectors, axis=0), stats.skew(vectors, axis=0),
+                    np.min(vectors, axis=0), np.max(vectors, axis=0))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            results = DescriptiveStatistics.descriptive_statistics(vectors)
+        for result, reference in zip(results, expected):
+            assert np.allclose(result, reference, equal_nan=True)
+
+    @pt.mark.parametrize("dim", ['col', 'row'])
+    def test_descriptive_statistics_of_integer_frame_equal_per_vector_table(self, dim):
+        """
+        Test that the descriptive statistics table of an integer frame, also when read from
+        the float buffer of NormalityBattery, equals the table of the per-vector reductions,
+        i.e. integer min and max and unchanged rounded digits
+
+        """
+        df = pd.DataFrame(np.random.RandomState(90210).randint(-5000, 10000, size=(300, 25)))
+        table = PrettyTable(vrules=2, hrules=3)
+        table.field_names = ['        ', dim, '      mean', '      median', '  variance',
+                             '       stdev', '  kurtosis', '    skewness', '       min',
+                             '         max']
+        for i, vector in (df.items() if dim == 'col' else df.iterrows()):
+            table.add_row([''] + [round(param, 5) for param in
+                                  [i + 1, np.mean(vector), np.median(vector), np.var(vector),
+                                   np.std(vector), stats.kurtosis(vector), stats.skew(vector),
+                                   min(vector), max(vector)]])
+        table.align = "r"
+        assert DescriptiveStatistics(df, dim=dim).generate_descriptive_statistics() == str(table)
+        assert NormalityBattery(df).descriptive_statistics(dim=dim) == str(table)
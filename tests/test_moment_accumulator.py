@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+
+__author__ = 'Samir Adrik'
+__email__ = 'samir.adrik@gmail.com'
+
+from source.util.descriptive_statistics import DescriptiveStatistics
+from source.util.moment_accumulator import MomentAccumulator
+from source.util.batched_statistics import BatchedStatistics
+from source.util.dataframe_generator import DataFrameGenerator
+import scipy.stats as stats
+import pandas as pd
+import numpy as np
+import pytest as pt
+
+
+class TestMomentAccumulator:
+
+    @pt.fixture(autouse=True)
+    def setup(self):
+        """
+        Executed before all tests
+
+        """
+        self.df = DataFrameGenerator(seed=90210, size=(200, 12)).mixed_data_frame() + 100
+        self.x = self.df.to_numpy(dtype=np.float64)
+        self.batches = np.split(self.x, [1, 3, 50, 51, 120])
+
+    def test_batches_give_same_moments_as_all_rows(self):
+        """
+        Test that accumulating batches of rows gives the same moments as computing them on all
+        rows at once, also for batches of a single row and far from zero means
+
+        """
+        accumulator = MomentAccumulator()
+        for batch in self.batches:
+            accumulator.update(batch)
+        for accumulated, expected in zip(accumulator.moments(), BatchedStatistics.moments(self.x)):
+            assert np.allclose(accumulated, expected, rtol=1e-9)
+
+    def test_merge_is_independent_of_order(self):
+        """
+        Test that merging accumulators of disjoint batches in any order gives the same result
+        as updating a single accumulator
+
+        """
+        parts = [MomentAccumulator().update(batch) for batch in self.batches]
+        forward, backward = MomentAccumulator(), MomentAccumulator()
+        for part in parts:
+            forward.merge(part)
+        for part in reversed(parts):
+            backward.merge(part)
+        for a, b in zip(forward.moments(), backward.moments()):
+            assert np.allclose(a, b, rtol=1e-9)
+
+    def test_statistics_equal_descriptive_statistics_and_scipy(self):
+        """
+        Test that the accumulated descriptive statistics, Jarque-Bera and D'Agostino K^2 tests
+        equal the in-memory results
+
+        """
+        accumulator = MomentAccumulator()
+        for batch in self.batches:
+            accumulator.update(pd.DataFrame(batch))
+        expected = DescriptiveStatistics.descriptive_statistics(self.x)
+        for accumulated, reference in zip(accumulator.descriptive_statistics(),
+                                          expected[:1] + expected[2:]):
+            assert np.allclose(accumulated, reference)
+        for j in range(self.x.shape[1]):
+            assert np.allclose([accumulator.jarque_bera()[0][j], accumulator.jarque_bera()[1][j]],
+                               stats.jarque_bera(self.x[:, j]))
+            assert np.allclose([accumulator.dagostino_k2()[0][j],
+                                accumulator.dagostino_k2()[1][j]], stats.normaltest(self.x[:, j]))
+
+    def test_value_errors_raised_for_empty_or_mismatched_data(self):
+        """
+        Test that ValueError is raised when nothing has been accumulated, or the number or
+        labels of the columns change
+
+        """
+        with pt.raises(ValueError):
+            MomentAccumulator().moments()
+        accumulator = MomentAccumulator().update(self.x)
+        with pt.raises(ValueError):
+            accumulator.update(self.x[:, :5])
+        labelled = MomentAccumulator().update(self.df)
+        with pt.raises(ValueError):
+            labelled.update(self.df.rename(columns=lambda column: 'x{}'.format(column)))
+        with pt.raises(ValueError):
+            MomentAccumulator().update(self.df.iloc[:, ::-1]).merge(labelled)
+        assert labelled.update(self.x).merge(MomentAccumulator().update(self.df)).n == 600
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+
+__author__ = 'Samir Adrik'
+__email__ = 'samir.adrik@gmail.com'
+
+from source.multivariate_norm.doornik_hansen import DoornikHansen
+from source.multivariate_norm.energy import Energy
+from source.multivariate_norm.henze_zirkler import HenzeZirkler
+from source.multivariate_norm.mardia import Mardia
+from source.multivariate_norm.mvn_batch import MvnBatch
+from source.multivariate_norm.r_session import RSession
+from source.multivariate_norm.royston import Royston
+from source.util.univariate_normality import UnivariateNormality
+from source.util.dataframe_generator import DataFrameGenerator
+from concurrent.futures import ThreadPoolExecutor
+from tests.test_setup import TestSetup
+import numpy as np
+import pytest as pt
+import threading
+import time
+
+
+class TestMultivariateNorm(TestSetup):
+
+    @pt.fixture(autouse=True)
+    def setup(self):
+        """
+        Executed before all tests
+
+        """
+        super(TestMultivariateNorm, self).setup()
+        dfg = DataFrameGenerator(seed=self.seed, size=(100, 5))
+        self.tall_dfs = {method: getattr(dfg, method)() for method in dfg.__getmethods__()}
+
+    @pt.mark.parametrize("invalid_backend", ['python', 'R', ''])
+    def test_value_error_raised_when_invalid_backend_is_passed(self, invalid_backend):
+        """
+        Test that ValueError is raised when a backend that is not implemented is passed to a
+        normality test
+
+        """
+        for df in self.dfs.values():
+            with pt.raises(ValueError):
+                Mardia(df, backend=invalid_backend)
+
+    @pt.mark.parametrize("invalid_tile_size", [0, -1])
+    def test_value_error_raised_when_tile_size_is_not_positive(self, invalid_tile_size):
+        """
+        Test that ValueError is raised when tile_size is not a positive integer
+
+        """
+        for df in self.dfs.values():
+            with pt.raises(ValueError):
+                Mardia(df, backend='numpy', tile_size=invalid_tile_size)
+
+    def test_native_mardia_is_independent_of_tile_size(self):
+        """
+        Test that the native Mardia test gives the same results regardless of the number of
+        tiles the Mahalanobis cross-product matrix is split into
+
+        """
+        for df in self.tall_dfs.values():
+            tiled = Mardia(df, backend='numpy', tile_size=3).print_results()
+            untiled = Mardia(df, backend='numpy', tile_size=df.shape[0]).print_results()
+            assert len(tiled) == 4
+            assert np.allclose(tiled, untiled)
+            assert all(0 <= p <= 1 for p in tiled[1::2])
+
+    def test_native_henze_zirkler_is_independent_of_tiles_and_threads(self):
+        """
+        Test that the native Henze-Zirkler test gives the same results regardless of the tile
+        size and the number of threads summing the kernel tiles
+
+        """
+        for df in self.tall_dfs.values():
+            parallel = HenzeZirkler(df, backend='numpy', tile_size=7, n_jobs=4).print_results()
+            serial = HenzeZirkler(df, backend='numpy', tile_size=df.shape[0],
+                                  n_jobs=1).print_results()
+            assert len(parallel) == 2
+            assert np.allclose(parallel, serial)
+            assert 0 <= parallel[1] <= 1
+
+    def test_native_royston_reuses_univariate_shapiro_wilk_statistics(self):
+        """
+        Test that the native Royston test gives the same results whether the Shapiro-Wilk
+        statistics are computed by the test or reused from UnivariateNormality
+
+        """
+        for df in self.tall_dfs.values():
+            sw = UnivariateNormality(df).univariate_normality_results()['sw'][0]
+            reused = Royston(df, backend='numpy', sw=sw).print_results()
+            computed = Royston(df, backend='numpy').print_results()
+            assert np.allclose(reused, computed)
+            assert 0 <= reused[1] <= 1
+
+    def test_value_error_raised_when_sw_does_not_match_columns(self):
+        """
+        Test that ValueError is raised when the number of Shapiro-Wilk statistics passed to
+        Royston does not match the number of columns
+
+        """
+        for df in self.tall_dfs.values():
+            with pt.raises(ValueError):
+                Royston(df, backend='numpy', sw=np.ones(df.shape[1] + 1))
+
+    def test_native_doornik_hansen_is_invariant_to_column_scaling(self):
+        """
+        Test that the native Doornik-Hansen test, which works on the correlation matrix, gives
+        the same results when the columns are rescaled
+
+        """
+        for df in self.tall_dfs.values():
+            results = DoornikHansen(df, backend='numpy').print_results()
+            scaled = DoornikHansen(df * np.arange(1, df.shape[1] + 1),
+                                   backend='numpy').print_results()
+            assert len(results) == 2
+            assert np.allclose(results, scaled)
+            assert 0 <= results[1] <= 1
+
+    def test_native_energy_is_reproducible_regardless_of_worker_count(self):
+        """
+        Test that the native Energy test gives the same results for a given seed regardless of
+        the number of processes or threads running the bootstrap
+
+        """
+        for df in self.tall_dfs.values():
+            parallel = Energy(df, backend='numpy', tile_size=7, n_jobs=2,
+                              seed=self.seed).run_native_e_test(boot=10)
+            threaded = Energy(df, backend='numpy', n_jobs=3, seed=self.seed,
+                              executor='thread').run_native_e_test(boot=10)
+            serial = Energy(df, backend='numpy', n_jobs=1,
+                            seed=self.seed).run_native_e_test(boot=10)
+            assert np.allclose(parallel, serial) and np.allclose(threaded, serial)
+            assert 0 <= parallel[1] <= 1
+        with pt.raises(ValueError):
+            Energy(df, backend='numpy', executor='fork')
+
+    def test_native_tests_equal_r_mvn(self):
+        """
+        Test that the native Mardia, Royston, Henze-Zirkler and Doornik-Hansen tests give the
+        same statistics and p-values as the r MVN package
+
+        """
+        pt.importorskip('rpy2')
+        tests = {'mardia': Mardia, 'royston': Royston, 'henze-zirkler': HenzeZirkler,
+                 'doornik-hansen': DoornikHansen}
+        for df in self.tall_dfs.values():
+            results = MvnBatch(df, tests=tuple(tests)).print_results()
+            for test, cls in tests.items():
+                assert np.allclose(cls(df, backend='numpy').print_results(), results[test])
+
+    def test_native_energy_statistic_equals_r_mvn(self):
+        """
+        Test that the native Energy test gives the same statistic as the r MVN package, the
+        bootstrapped p-values are random and only compared in range
+
+        """
+        pt.importorskip('rpy2')
+        for df in self.tall_dfs.values():
+            native = Energy(df, backend='numpy', seed=self.seed).run_native_e_test(boot=10)
+            results = MvnBatch(df, tests=('energy',), boot=10).print_results()['energy']
+            assert np.isclose(native[0], results[0])
+            assert 0 <= native[1] <= 1
+
+    @pt.mark.parametrize("invalid_tests", [('hz',), ('mardia', 'shapiro')])
+    def test_value_error_raised_when_unknown_test_is_batched(self, invalid_tests):
+        """
+        Test that ValueError is raised when a test that is not in the MVN module is passed to
+        MvnBatch
+
+        """
+        for df in self.dfs.values():
+            with pt.raises(ValueError):
+                MvnBatch(df, tests=invalid_tests)
+
+    def test_r_matrix_key_identifies_the_viewed_memory(self):
+        """
+        Test that views of the same memory share the key of their r matrix, while transposed
+        or sliced views and other arrays get a different key
+
+        """
+        array = np.array(list(self.tall_dfs.values())[0], dtype=np.float64)
+        owner, key = RSession.matrix_key(array[:, :])
+        assert owner is array and key == RSession.matrix_key(array)[1]
+        assert key != RSession.matrix_key(array.T)[1]
+        assert key != RSession.matrix_key(array[:, 1:])[1]
+        assert key != RSession.matrix_key(array.copy())[1]
+        with pt.raises(ValueError):
+            RSession.matrix(array[:, 0])
+
+    def test_r_matrix_digest_identifies_the_values(self):
+        """
+        Test that arrays with the same values, shape and dtype get the same digest whether they
+        are contiguous or strided views, and that other values or layouts get another digest
+
+        """
+        array = np.array(list(self.tall_dfs.values())[0], dtype=np.float64, order='C')
+        digest = RSession.matrix_digest(array)
+        assert digest == RSession.matrix_digest(array.copy())
+        assert digest == RSession.matrix_digest(np.repeat(array, 2, axis=1)[:, ::2])
+        assert digest != RSession.matrix_digest(array.astype(np.float32))
+        assert digest != RSession.matrix_digest(array[:, 1:])
+        assert (RSession.matrix_digest(np.asfortranarray(array))
+                == RSession.matrix_digest(np.asfortranarray(array.copy())))
+        array[0, 0] += 1
+        assert digest != RSession.matrix_digest(array)
+
+    def test_r_matrix_is_transferred_once_per_buffer(self):
+        """
+        Test that the r matrix holds the values of the array in any memory order and dtype,
+        and that it is reused for the same values until the buffer is garbage collected
+
+        """
+        pt.importorskip('rpy2')
+        array = np.array(list(self.tall_dfs.values())[0], dtype=np.float64)
+        for values in [array, np.asfortranarray(array), array.astype(np.float32)]:
+            matrix = RSession.matrix(values)
+            assert tuple(matrix.do_slot('dim')) == values.shape
+            assert np.array_equal(np.asarray(matrix.memoryview()).reshape(values.shape, order='F'),
+                                  values.astype(np.float64))
+            assert RSession.matrix(values) is matrix
+        view, key = RSession.matrix_key(array)[1], RSession.matrix_digest(array)
+        del array, values
+        assert view not in RSession._views and key not in RSession._matrices
+
+    def test_r_calls_run_one_at_a_time_on_the_dispatcher_thread(self):
+        """
+        Test that calls from many threads all run on the single dispatcher thread without
+        overlapping, that nested calls do not deadlock and that exceptions reach the caller
+
+        """
+        active, overlaps = [], []
+
+        def exclusive():
+            active.append(1)
+            overlaps.append(len(active))
+            time.sleep(0.01)
+            active.pop()
+            return threading.get_ident()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            idents = set(pool.map(lambda _: RSession.call(exclusive), range(16)))
+        assert len(idents) == 1 and threading.get_ident() not in idents
+        assert max(overlaps) == 1
+        assert RSession.call(RSession.call, threading.get_ident) in idents
+        with pt.raises(ValueError):
+            RSession.call(int, 'normb')
+
+    def test_r_code_is_evaluated_in_private_environments(self):
+        """
+        Test that concurrent evaluations see their own variables and leave nothing in the
+        global r environment
+
+        """
+        pt.importorskip('rpy2')
+        arrays = [np.full((5, 2), float(i)) for i in range(8)]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda array: RSession.evaluate(
+                'res <- df[1, 1]; Sys.sleep(0.01); res', df=RSession.matrix(array)), arrays))
+        assert results == [[float(i)] for i in range(8)]
+        assert RSession.evaluate('as.numeric(exists("res", envir = globalenv()))') == [0.0]
@@ -4,12 +4,21 @@ __author__ = 'Samir Adrik'
 __email__ = 'samir.adrik@gmail.com'
 
 from source.exceptions.only_numeric_df_accepted import OnlyNumericDfAccepted
+from source.util.univariate_normality import UnivariateNormality
 from source.normality_battery import NormalityBattery
 from source.util.dataframe_generator import DataFrameGenerator
+from source.util.column_blocks import ColumnBlocks
+from concurrent.futures import ProcessPoolExecutor
+from source.util import shared_buffer
+from source.multivariate_norm.mardia import Mardia
+from source.util.generator import Generator
 from tests.test_setup import TestSetup
 import pytest as pt
+import numpy as np
 import pandas as pd
+import subprocess
 import shutil
+import sys
 import os
 
 
@@ -62,12 +71,13 @@ class TestNormalityBattery(TestSetup):
                 if i == j:
                     pd.testing.assert_frame_equal(df, nb.df)
 
-    def test_os_error_in_print_report(self):
+    def test_os_error_in_print_report(self, tmp_path):
         """
         OSError raised when invalid file_dir is passed to print_report() method
 
         """
-        invalid_file_dir = '._?`/1234'  # Invalid dir name
+        (tmp_path / 'file').touch()
+        invalid_file_dir = str(tmp_path / 'file' / '1234')  # dir below a file
         for nb in self.nbs.values():
             with pt.raises(OSError):
                 nb.normality_report(file_dir=invalid_file_dir)
@@ -109,3 +119,132 @@ class TestNormalityBattery(TestSetup):
             shutil.rmtree("reports")
         except OSError:
             pass
+
+    def test_importing_normality_battery_does_not_start_r(self):
+        """
+        Test that rpy2, and with it r, is not imported together with the NormalityBattery
+
+        """
+        code = "import sys, source.normality_battery; print('rpy2' in sys.modules)"
+        output = subprocess.check_output([sys.executable, '-c', code])
+        assert output.decode().strip() == 'False'
+
+    def test_stage_results_are_reused_until_df_is_replaced(self, monkeypatch):
+        """
+        Test that repeated calls reuse the cached univariate results, and that replacing df
+        reruns the tests on the new df
+
+        """
+        calls = []
+        run = UnivariateNormality.univariate_normality_results
+
+        def counting_run(generator):
+            calls.append(generator.df)
+            return run(generator)
+
+        monkeypatch.setattr(UnivariateNormality, 'univariate_normality_results', counting_run)
+        dfs = list(self.dfs.values())
+        nb = NormalityBattery(dfs[0])
+        first = nb.univariate_normality()
+        assert nb.univariate_normality() == first
+        assert len(calls) == 1
+        nb.univariate_normality(digits=3)
+        assert len(calls) == 2
+
+        nb.df = dfs[1]
+        assert nb.univariate_normality() == NormalityBattery(dfs[1]).univariate_normality()
+        assert len(calls) == 4
+        assert calls[2] is nb.df
+        pd.testing.assert_frame_equal(nb.df, dfs[1])
+
+    def test_value_error_raised_when_replacing_df_with_too_few_observations(self):
+        """
+        Test that replacing df is validated the same way as passing it to the constructor
+
+        """
+        nb = list(self.nbs.values())[0]
+        with pt.raises(ValueError):
+            nb.df = pd.DataFrame([[1.0] * 10] * 10)
+
+    def test_native_multivariate_results_are_reproducible_per_seed(self, tmp_path):
+        """
+        Test that the native multivariate results of the battery, whose energy p-value is
+        bootstrapped, are the same for a given seed and cached on disk per seed
+
+        """
+        df = list(self.dfs.values())[0]
+        cache_dir = str(tmp_path)
+        results = NormalityBattery(df, cache_dir=cache_dir).multivariate_normality(
+            backend='numpy')
+        assert results == NormalityBattery(df).multivariate_normality(backend='numpy', n_jobs=2)
+        other = NormalityBattery(df, cache_dir=cache_dir, seed=1)
+        assert other.multivariate_key('numpy', 5) != NormalityBattery(df).multivariate_key(
+            'numpy', 5)
+        assert len(os.listdir(cache_dir)) == 1
+        other.multivariate_normality(backend='numpy')
+        assert len(os.listdir(cache_dir)) == 2
+
+    def test_process_stages_share_one_shared_buffer_and_pool(self, monkeypatch):
+        """
+        Test that the stages of a battery run with the process executor copy df once into
+        shared memory and start one process pool, that all blocks of out-of-core data run on
+        one pool, and that the results equal the threaded results
+
+        """
+        started = []
+
+        class RecordingPool(ProcessPoolExecutor):
+            def __init__(self, *args, **kwargs):
+                started.append(1)
+                super().__init__(*args, **kwargs)
+
+        monkeypatch.setattr(shared_buffer, 'ProcessPoolExecutor', RecordingPool)
+        df = list(self.dfs.values())[0]
+        nb, threaded = NormalityBattery(df), NormalityBattery(df)
+        for dim in ['col', 'row']:
+            assert (nb.univariate_normality(dim=dim, n_jobs=2, executor='process')
+                    == threaded.univariate_normality(dim=dim, n_jobs=2))
+            assert (nb.descriptive_statistics(dim=dim, n_jobs=2, executor='process')
+                    == threaded.descriptive_statistics(dim=dim, n_jobs=2))
+            if dim == 'col':
+                buffer, shm = nb.shared_buffer('process'), nb.shared_buffer('process').state['shm']
+        assert len(started) == 1 and buffer.state['shm'] is shm and buffer.source is nb.df
+        nb.close()
+        assert not buffer.finalizer.alive and buffer.state['shm'] is None
+
+        blocks = ColumnBlocks(np.asarray(df, dtype=np.float64), block_size=7)
+        for dim in ['col', 'row']:
+            results = Generator.map_vectors(UnivariateNormality.univariate_statistics, blocks,
+                                            dim, 2, 'process')
+            expected = UnivariateNormality.univariate_statistics(
+                np.asarray(df, dtype=np.float64) if dim == 'col' else np.asarray(df).T)
+            assert all(np.allclose(a, b) for a, b in zip(results, expected))
+        assert len(started) == 3
+
+    def test_all_stages_share_one_buffer(self, monkeypatch):
+        """
+        Test that df is converted once into a C-contiguous buffer of the selected dtype, which
+        the univariate, descriptive and native multivariate tests read without copying
+
+        """
+        df = list(self.dfs.values())[0].astype(int)
+        seen = []
+        map_chunks = Generator.map_chunks
+
+        def recording_map_chunks(function, vectors, *args):
+            seen.append(vectors)
+            return map_chunks(function, vectors, *args)
+
+        monkeypatch.setattr(Generator, 'map_chunks', staticmethod(recording_map_chunks))
+        for dtype in [np.float64, np.float32]:
+            nb = NormalityBattery(df, dtype=dtype)
+            buffer = np.asarray(nb.df)
+            assert buffer.dtype == dtype and buffer.flags.c_contiguous
+            nb.univariate_normality()
+            nb.descriptive_statistics(dim='row')
+            assert all(np.shares_memory(vectors, buffer) for vectors in seen)
+            assert np.shares_memory(Mardia(nb.df, backend='numpy').data, buffer)
+            seen.clear()
+        with pt.raises(ValueError):
+            NormalityBattery(df, dtype=np.int64)
+
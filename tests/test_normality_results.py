@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+__author__ = 'Samir Adrik'
+__email__ = 'samir.adrik@gmail.com'
+
+from source.util.univariate_normality import UnivariateNormality
+from source.util.normality_results import NormalityResults
+from source.util.dataframe_generator import DataFrameGenerator
+from source.util.generator import Generator
+import numpy as np
+import pytest as pt
+
+
+class TestNormalityResults:
+
+    @pt.fixture(autouse=True)
+    def setup(self):
+        """
+        Executed before all tests
+
+        """
+        dfg = DataFrameGenerator(seed=90210, size=(50, 20))
+        self.dfs = [getattr(dfg, method)() for method in dfg.__getmethods__()]
+
+    def test_value_error_raised_when_shapes_do_not_match(self):
+        """
+        Test that ValueError is raised when the statistics or p-values do not have one row per
+        test and one column per vector
+
+        """
+        with pt.raises(ValueError):
+            NormalityResults(('jb', 'sw'), [0, 1, 2], np.zeros((2, 3)), np.zeros((3, 2)))
+
+    def test_significance_matches_astrix_notation(self):
+        """
+        Test that the significance levels equal the number of asterisks Generator.astrix()
+        renders, including p-values on the limits and nan
+
+        """
+        p_values = np.array([[0.00001, 0.0001, 0.00049, 0.01, 0.0500001, 0.05000004, 0.3,
+                              np.nan]])
+        results = NormalityResults(('test',), range(p_values.shape[1]), np.zeros_like(p_values),
+                                   p_values, digits=7)
+        stars = [Generator.astrix(round(p, 7)).count('*') for p in p_values[0]]
+        assert list(results.significance()[0]) == stars
+
+    def test_passed_equals_count_of_asterisks_in_rendered_table(self):
+        """
+        Test that counting passed tests on the results gives the same number as counting the
+        asterisks in the rendered univariate table
+
+        """
+        for df in self.dfs:
+            for dim in ['col', 'row']:
+                un = UnivariateNormality(df, dim=dim)
+                results = un.univariate_normality_results()
+                table = un.generate_univariate_normality_results(results)
+                assert results.passed() == Generator.count_astrix(table)
+                assert results.conducted() == 4 * len(results.labels)
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+
+__author__ = 'Samir Adrik'
+__email__ = 'samir.adrik@gmail.com'
+
+from source.multivariate_norm.r_worker_pool import RWorkerPool
+from source.util.dataframe_generator import DataFrameGenerator
+from source.multivariate_norm.mvn_batch import MvnBatch
+import numpy as np
+import threading
+import pytest as pt
+import time
+import os
+
+
+class TestRWorkerPool:
+
+    @pt.fixture(autouse=True)
+    def setup(self):
+        """
+        Executed before all tests
+
+        """
+        self.pool = RWorkerPool(n_workers=2, timeout=2.0, initializer=None)
+        yield
+        self.pool.shutdown()
+
+    @pt.mark.parametrize("invalid_n_workers", [0, -1])
+    def test_value_error_raised_when_n_workers_is_not_positive(self, invalid_n_workers):
+        """
+        Test that ValueError is raised when the pool gets no workers
+
+        """
+        with pt.raises(ValueError):
+            RWorkerPool(n_workers=invalid_n_workers, initializer=None)
+
+    def test_value_error_raised_when_unknown_test_is_run(self):
+        """
+        Test that ValueError is raised before any data is shared when a test is not in MvnBatch
+
+        """
+        df = DataFrameGenerator(seed=90210, size=(30, 5)).normal_data_frame()
+        with pt.raises(ValueError):
+            self.pool.run(df, tests=('mardia', 'shapiro'))
+
+    def test_crashed_worker_is_restarted(self):
+        """
+        Test that a task crashing its worker is retried on a fresh worker, and that the pool
+        keeps working after the task gave up
+
+        """
+        with pt.raises(RuntimeError):
+            self.pool.call((os._exit, (1,)))
+        assert self.pool.map([(abs, (-1,)), (abs, (-2,)), (abs, (-3,))]) == [1, 2, 3]
+
+    def test_hung_worker_is_restarted(self):
+        """
+        Test that a worker not answering within timeout is replaced
+
+        """
+        with pt.raises(RuntimeError):
+            self.pool.call((time.sleep, (60,)), retries=0)
+        assert self.pool.call((abs, (-4,))) == 4
+
+    def test_errors_of_tasks_are_raised_and_do_not_kill_the_worker(self):
+        """
+        Test that an exception in a task is raised in the caller as RuntimeError, without
+        restarting the worker
+
+        """
+        processes = {worker[0].pid for worker in list(self.pool.idle.queue)}
+        with pt.raises(RuntimeError):
+            self.pool.call((int, ('normb',)))
+        assert {worker[0].pid for worker in list(self.pool.idle.queue)} == processes
+
+    def test_tasks_run_concurrently(self):
+        """
+        Test that the tasks are spread across the workers
+
+        """
+        self.pool.map([(abs, (0,))] * 2)
+        start = time.perf_counter()
+        self.pool.map([(time.sleep, (0.5,))] * 2)
+        assert time.perf_counter() - start < 0.9
+
+    def test_shared_pools_are_kept_per_number_of_workers(self, monkeypatch):
+        """
+        Test that requesting a shared pool of another size does not shut down the pool other
+        threads may still be using
+
+        """
+        monkeypatch.setattr(RWorkerPool, '_shared', {})
+        try:
+            one = RWorkerPool.shared(1)
+            two = RWorkerPool.shared(2)
+            assert one is not two and RWorkerPool.shared(1) is one
+            assert not one.closed and one.idle.qsize() == 1
+        finally:
+            for pool in RWorkerPool._shared.values():
+                pool.shutdown()
+
+    def test_busy_workers_are_stopped_after_shutdown(self):
+        """
+        Test that a worker busy with a task while the pool is shut down is stopped when the
+        task is done instead of being handed back to the pool
+
+        """
+        processes = [worker[0] for worker in list(self.pool.idle.queue)]
+        thread = threading.Thread(target=self.pool.call, args=((time.sleep, (1,)),))
+        thread.start()
+        time.sleep(0.5)
+        self.pool.shutdown()
+        assert self.pool.idle.empty()
+        thread.join()
+        assert self.pool.idle.empty()
+        assert not any(process.is_alive() for process in processes)
+        with pt.raises(RuntimeError):
+            self.pool.call((abs, (-1,)))
+
+    def test_worker_results_equal_embedded_r_session(self):
+        """
+        Test that the tests run on the r workers give the same statistics as the embedded r
+        session, apart from the random energy bootstrap
+
+        """
+        pt.importorskip('rpy2')
+        df = DataFrameGenerator(seed=90210, size=(100, 5)).normal_data_frame()
+        tests = ('mardia', 'royston', 'henze-zirkler', 'doornik-hansen')
+        pool = RWorkerPool(n_workers=2)
+        try:
+            for test, results in pool.run(df, tests).items():
+                assert np.allclose(results, MvnBatch(df, tests=(test,)).print_results()[test])
+        finally:
+            pool.shutdown()
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+__author__ = 'Samir Adrik'
+__email__ = 'samir.adrik@gmail.com'
+
+from source.util.univariate_normality import UnivariateNormality
+from source.util.normality_results import NormalityResults
+from source.util.dataframe_generator import DataFrameGenerator
+from source.normality_battery import NormalityBattery
+from source.util.result_cache import ResultCache
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pytest as pt
+import os
+
+
+class TestResultCache:
+
+    @pt.fixture(autouse=True)
+    def setup(self, tmp_path):
+        """
+        Executed before all tests
+
+        """
+        self.directory = str(tmp_path / 'cache')
+        self.df = DataFrameGenerator(seed=90210, size=(50, 20)).normal_data_frame()
+        self.results = NormalityResults(('jb', 'sw'), [0, 1, 2], np.arange(6.).reshape(2, 3),
+                                        np.linspace(0, 1, 6).reshape(2, 3))
+
+    def test_fingerprint_depends_on_values_shape_and_dtype(self):
+        """
+        Test that the fingerprint of a df changes with its values, shape and dtype but not with
+        its identity
+
+        """
+        fingerprint = ResultCache.fingerprint(self.df)
+        assert ResultCache.fingerprint(self.df.copy()) == fingerprint
+        changed = self.df.copy()
+        changed.iloc[3, 4] += 1e-12
+        assert ResultCache.fingerprint(changed) != fingerprint
+        assert ResultCache.fingerprint(self.df.iloc[:, :10]) != fingerprint
+        assert ResultCache.fingerprint(self.df.astype(np.float32)) != fingerprint
+
+    def test_stored_results_are_loaded_unchanged(self):
+        """
+        Test that results are loaded with the same tests, statistics and p-values as stored,
+        and that unknown keys are a miss
+
+        """
+        cache = ResultCache(self.directory)
+        key = cache.key(ResultCache.fingerprint(self.df), ('univariate', 'col', 5))
+        assert cache.load(key, [0, 1, 2], 5) is None
+        cache.store(key, self.results)
+        loaded = cache.load(key, [0, 1, 2], 5)
+        assert loaded.tests == self.results.tests
+        assert np.array_equal(loaded.statistics, self.results.statistics)
+        assert np.array_equal(loaded.p_values, self.results.p_values)
+
+    def test_concurrent_stores_of_the_same_key_do_not_collide(self):
+        """
+        Test that threads storing the same key at once each write their own temporary file,
+        and that a complete entry and no temporary files are left
+
+        """
+        cache = ResultCache(self.directory)
+        key = cache.key(ResultCache.fingerprint(self.df), ('univariate', 'col', 5))
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda _: cache.store(key, self.results), range(32)))
+        assert os.listdir(self.directory) == [key + ResultCache.suffix]
+        assert np.array_equal(cache.load(key, [0, 1, 2], 5).p_values, self.results.p_values)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        """
+        Test that the least recently used entries are removed once the cache grows beyond
+        max_bytes
+
+        """
+        cache = ResultCache(self.directory)
+        cache.store('first', self.results)
+        size = os.path.getsize(cache.path('first'))
+        cache.max_bytes = 2 * size
+        cache.store('second', self.results)
+        os.utime(cache.path('first'), (0, 0))
+        os.utime(cache.path('second'), (1, 1))
+        assert cache.load('first', [0, 1, 2], 5) is not None
+        cache.store('third', self.results)
+        assert sorted(os.listdir(self.directory)) == ['first.npz', 'third.npz']
+
+    def test_value_error_raised_when_max_bytes_is_negative(self):
+        """
+        Test that ValueError is raised when the cache is given a negative size
+
+        """
+        with pt.raises(ValueError):
+            ResultCache(self.directory, -1)
+
+    def test_batteries_on_equal_dfs_share_cached_results(self, monkeypatch):
+        """
+        Test that a second battery on an equal df loads the univariate results from disk
+        instead of running the tests again
+
+        """
+        calls = []
+        run = UnivariateNormality.univariate_normality_results
+
+        def counting_run(generator):
+            calls.append(generator.df)
+            return run(generator)
+
+        monkeypatch.setattr(UnivariateNormality, 'univariate_normality_results', counting_run)
+        first = NormalityBattery(self.df, cache_dir=self.directory).univariate_normality()
+        second = NormalityBattery(self.df.copy(), cache_dir=self.directory).univariate_normality()
+        assert first == second
+        assert len(calls) == 1
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+__author__ = 'Samir Adrik'
+__email__ = 'samir.adrik@gmail.com'
+
+from source.util.normality_results import NormalityResults
+from source.util.dataframe_generator import DataFrameGenerator
+from source.util.result_exporter import ResultExporter
+from source.normality_battery import NormalityBattery
+import pandas as pd
+import numpy as np
+import pytest as pt
+
+
+class TestResultExporter:
+
+    @pt.fixture(autouse=True)
+    def setup(self, tmp_path):
+        """
+        Executed before all tests
+
+        """
+        self.file_dir = str(tmp_path / 'results')
+        self.results = NormalityResults(('jb', 'sw'), [0, 1, 2], np.arange(6.).reshape(2, 3),
+                                        [[0.5, 0.04, 0.00001], [0.2, 0.01, np.nan]])
+
+    def test_results_frame_has_one_row_per_test_and_vector(self):
+        """
+        Test that the long table of the results holds every statistic, p-value and
+        significance level once
+
+        """
+        frame = self.results.to_frame()
+        assert list(frame.columns) == ['label', 'test', 'statistic', 'p-value', 'significance']
+        assert list(frame['test']) == ['jb'] * 3 + ['sw'] * 3
+        assert list(frame['label']) == [0, 1, 2] * 2
+        assert list(frame['statistic']) == list(range(6))
+        assert list(frame['significance']) == [0, 1, 4, 0, 2, 4]
+
+    def test_first_available_format_is_used_by_default(self, monkeypatch):
+        """
+        Test that the binary formats are preferred and CSV is the fallback when no engine is
+        installed
+
+        """
+        monkeypatch.setattr(ResultExporter, 'available',
+                            staticmethod(lambda fmt: fmt in ('feather', 'csv')))
+        assert ResultExporter(self.file_dir).fmt == 'feather'
+        monkeypatch.setattr(ResultExporter, 'available',
+                            staticmethod(lambda fmt: fmt in ('csv', 'json')))
+        assert ResultExporter(self.file_dir).fmt == 'csv'
+
+    def test_errors_raised_for_unknown_or_unavailable_formats(self, monkeypatch):
+        """
+        Test that ValueError is raised for unknown formats and ImportError for formats whose
+        engine is not installed
+
+        """
+        with pt.raises(ValueError):
+            ResultExporter(self.file_dir, 'xlsx')
+        monkeypatch.setattr(ResultExporter, 'available', staticmethod(lambda fmt: False))
+        with pt.raises(ImportError):
+            ResultExporter(self.file_dir, 'parquet')
+
+    @pt.mark.parametrize("fmt, read", [('csv', pd.read_csv),
+                                       ('json', lambda path: pd.read_json(path, lines=True))])
+    def test_written_tables_can_be_read_back(self, fmt, read):
+        """
+        Test that the tables written as CSV and JSON are read back unchanged
+
+        """
+        frame = self.results.to_frame()
+        path = ResultExporter(self.file_dir, fmt).write(frame, 'univariate')
+        pd.testing.assert_frame_equal(read(path), frame, check_dtype=False)
+
+    def test_battery_exports_all_tables(self):
+        """
+        Test that the battery exports univariate, multivariate, descriptive and summary tables
+        consistent with each other
+
+        """
+        df = DataFrameGenerator(seed=90210, size=(100, 10)).normal_data_frame()
+        paths = NormalityBattery(df).export_results(self.file_dir, backend='numpy', fmt='csv')
+        tables = {name: pd.read_csv(path) for name, path in paths.items()}
+        assert len(tables['univariate']) == 4 * df.shape[1]
+        assert len(tables['multivariate']) == 6
+        assert len(tables['descriptive']) == df.shape[1]
+        summary = tables['summary'].set_index('stage')
+        assert summary.loc['univariate', 'conclusive'] == np.count_nonzero(
+            tables['univariate']['significance'])
+        assert summary.loc['total', 'conducted'] == 4 * df.shape[1] + 6
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+__author__ = 'Samir Adrik'
+__email__ = 'samir.adrik@gmail.com'
+
+from source.util.descriptive_statistics import DescriptiveStatistics
+from source.util.univariate_normality import UnivariateNormality
+from source.util.dataframe_generator import DataFrameGenerator
+from source.util.table_writer import TableWriter
+from prettytable import PrettyTable
+import pytest as pt
+import io
+
+
+class TestTableWriter:
+
+    @pt.fixture(autouse=True)
+    def setup(self):
+        """
+        Executed before all tests
+
+        """
+        self.field_names = ['    ', 'col', '        jb', 'p-value (jb)']
+        self.rows = [['', str(i), str(10.0 ** i / 3), '0.0{}*'.format(i)] for i in range(12)]
+        self.df = DataFrameGenerator(seed=90210, size=(50, 20)).normal_data_frame()
+
+    @pt.mark.parametrize("frame, hrules", [(True, 0), (False, 3)])
+    def test_table_equals_prettytable_layout(self, frame, hrules):
+        """
+        Test that the tables have the same layout as right-aligned PrettyTables without
+        vertical rules, for every chunk size
+
+        """
+        table = PrettyTable(vrules=2, hrules=hrules)
+        table.field_names = self.field_names
+        for row in self.rows:
+            table.add_row(row)
+        table.align = 'r'
+
+        columns = [list(column) for column in zip(*self.rows)]
+        for chunk_size in [1, 5, 12, 100]:
+            writer = TableWriter(self.field_names, frame=frame, chunk_size=chunk_size)
+            assert writer.render(columns) == str(table)
+
+    def test_value_error_raised_when_number_of_columns_does_not_match(self):
+        """
+        Test that ValueError is raised when there are more columns than field names
+
+        """
+        with pt.raises(ValueError):
+            TableWriter(self.field_names).render([[]] * 5)
+
+    def test_written_results_equal_generated_results(self):
+        """
+        Test that streaming the univariate and descriptive tables into a file gives the same
+        text as generating them as strings
+
+        """
+        for dim in ['col', 'row']:
+            un = UnivariateNormality(self.df, dim=dim)
+            file = io.StringIO()
+            un.write_univariate_normality_results(file)
+            assert file.getvalue() == un.generate_univariate_normality_results()
+
+            ds = DescriptiveStatistics(self.df, dim=dim)
+            file = io.StringIO()
+            ds.write_descriptive_statistics(file)
+            assert file.getvalue() == ds.generate_descriptive_statistics()